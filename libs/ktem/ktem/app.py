@@ -1,22 +1,163 @@
+import copy
 import os
+from collections import namedtuple
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Hashable, Optional
 
-import gradio as gr
 import pluggy
 from ktem import extension_protocol
-from ktem.assets import PDFJS_PREBUILT_DIR, KotaemonTheme
 from ktem.components import reasonings
+from ktem.db.models import ensure_schema
 from ktem.exceptions import HookAlreadyDeclared, HookNotDeclared
-from ktem.index import IndexManager
 from ktem.settings import BaseSettingGroup, SettingGroup, SettingReasoningGroup
 from theflow.settings import settings
 from theflow.utils.modules import import_dotted_string
 
+if TYPE_CHECKING:
+    import gradio as gr
+
 BASE_PATH = os.environ.get("GR_FILE_ROOT_PATH", "")
 
+# app-level settings read once at import instead of per BaseApp construction
+_SETTING_DEFAULTS = {
+    "KH_MODE": "",
+    "KH_APP_NAME": "Kotaemon",
+    "KH_APP_VERSION": "",
+    "KH_FEATURE_USER_MANAGEMENT": False,
+    "KH_REASONINGS": None,
+    "KH_ENABLE_TENANT_SYSTEM": True,
+}
+_SETTINGS_SNAPSHOT = {
+    key: getattr(settings, key, default) for key, default in _SETTING_DEFAULTS.items()
+}
+
+_MARKMAP_JS = """
+<script>
+    window.markmap = {
+        /** @type AutoLoaderOptions */
+        autoLoader: {
+            toolbar: true, // Enable toolbar
+        },
+    };
+</script>
+"""
+# third-party scripts are deferred so they don't block parsing of the page
+_EXTERNAL_JS_HEAD = (
+    "<script type='module' "
+    "src='https://cdn.skypack.dev/pdfjs-viewer-element'>"
+    "</script>"
+    "<script type='module' "
+    "src='https://cdnjs.cloudflare.com/ajax/libs/tributejs/5.1.3/tribute.min.js'>"  # noqa
+    f"{_MARKMAP_JS}"
+    "<script defer src='https://cdn.jsdelivr.net/npm/markmap-autoloader@0.16'></script>"  # noqa
+    "<script defer src='https://cdn.jsdelivr.net/npm/minisearch@7.1.1/dist/umd/index.min.js'></script>"  # noqa
+    "</script>"
+    "<link rel='stylesheet' href='https://cdnjs.cloudflare.com/ajax/libs/tributejs/5.1.3/tribute.css'/>"  # noqa
+)
+
+_gradio = None
+
+
+def _gr():
+    """Import gradio on first use
+
+    Gradio pulls in PIL, numpy and pandas, so only pay for it when a UI
+    component is actually built.
+    """
+    global _gradio
+    if _gradio is None:
+        import gradio
+
+        _gradio = gradio
+    return _gradio
+
+
+_Assets = namedtuple("_Assets", ["css", "js", "pdf_view_js", "svg_js", "favicon"])
+
+
+@lru_cache(maxsize=1)
+def _load_assets(app_version: str, base_path: str) -> _Assets:
+    """Read and pre-process the static assets, once per process"""
+    from ktem.assets import PDFJS_PREBUILT_DIR
+
+    dir_assets = Path(__file__).parent / "assets"
+    with (dir_assets / "css" / "main.css").open() as fi:
+        css = fi.read()
+    with (dir_assets / "js" / "main.js").open() as fi:
+        js = fi.read().replace("KH_APP_VERSION", app_version)
+    with (dir_assets / "js" / "pdf_viewer.js").open(encoding="utf-8") as fi:
+        # workaround for Windows path
+        pdf_js_dist_dir = str(PDFJS_PREBUILT_DIR).replace("\\", "\\\\")
+        pdf_view_js = (
+            fi.read()
+            .replace("PDFJS_PREBUILT_DIR", pdf_js_dist_dir)
+            .replace("GR_FILE_ROOT_PATH", base_path)
+        )
+    with (dir_assets / "js" / "svg-pan-zoom.min.js").open() as fi:
+        svg_js = fi.read()
+
+    return _Assets(
+        css=css,
+        js=js,
+        pdf_view_js=pdf_view_js,
+        svg_js=svg_js,
+        favicon=str(dir_assets / "img" / "favicon.svg"),
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_plugin_manager() -> pluggy.PluginManager:
+    """Create the extension plugin manager, discovering entrypoints once"""
+    exman = pluggy.PluginManager("ktem")
+    exman.add_hookspecs(extension_protocol)
+    exman.load_setuptools_entrypoints("ktem")
+    return exman
+
+
+@lru_cache(maxsize=1)
+def _get_extension_declarations() -> tuple[dict, ...]:
+    """Collect the declarations of the installed extensions, once"""
+    return tuple(_get_plugin_manager().hook.ktem_declare_extensions())
+
+
+class _PageTreeNode:
+    """Keep track of the `BasePage` attributes assigned to an object
+
+    Pages are recorded as they are assigned, so walking the page tree does not
+    need to scan and type-check every attribute in `__dict__`.
+    """
+
+    def __setattr__(self, name, value):
+        children = self.__dict__.setdefault("_child_pages", {})
+        if isinstance(value, BasePage):
+            children[name] = value
+        else:
+            children.pop(name, None)
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        self.__dict__.get("_child_pages", {}).pop(name, None)
+        super().__delattr__(name)
+
+    def add_child_page(self, key: Hashable, page: Any):
+        """Record a child page that is not assigned as an attribute
 
-class BaseApp:
+        Args:
+            key: the key of the page among the children, must not be an
+                attribute name
+            page: the page, ignored if it's not a `BasePage`
+        """
+        if isinstance(page, BasePage):
+            self.__dict__.setdefault("_child_pages", {})[key] = page
+
+    @property
+    def child_pages(self) -> list["BasePage"]:
+        """The direct child pages, in assignment order"""
+        return list(self.__dict__.get("_child_pages", {}).values())
+
+
+class BaseApp(_PageTreeNode):
     """The main app of Kotaemon
 
     The main application contains app-level information:
@@ -38,30 +179,21 @@ class BaseApp:
     public_events: list[str] = []
 
     def __init__(self):
-        self.dev_mode = getattr(settings, "KH_MODE", "") == "dev"
-        self.app_name = getattr(settings, "KH_APP_NAME", "Kotaemon")
-        self.app_version = getattr(settings, "KH_APP_VERSION", "")
-        self.f_user_management = getattr(settings, "KH_FEATURE_USER_MANAGEMENT", False)
+        from ktem.assets import KotaemonTheme
+
+        self.dev_mode = _SETTINGS_SNAPSHOT["KH_MODE"] == "dev"
+        self.app_name = _SETTINGS_SNAPSHOT["KH_APP_NAME"]
+        self.app_version = _SETTINGS_SNAPSHOT["KH_APP_VERSION"]
+        self.f_user_management = _SETTINGS_SNAPSHOT["KH_FEATURE_USER_MANAGEMENT"]
         self._theme = KotaemonTheme()
 
-        dir_assets = Path(__file__).parent / "assets"
-        with (dir_assets / "css" / "main.css").open() as fi:
-            self._css = fi.read()
-        with (dir_assets / "js" / "main.js").open() as fi:
-            self._js = fi.read()
-            self._js = self._js.replace("KH_APP_VERSION", self.app_version)
-        with (dir_assets / "js" / "pdf_viewer.js").open(encoding="utf-8") as fi:
-            self._pdf_view_js = fi.read()
-            # workaround for Windows path
-            pdf_js_dist_dir = str(PDFJS_PREBUILT_DIR).replace("\\", "\\\\")
-            self._pdf_view_js = self._pdf_view_js.replace(
-                "PDFJS_PREBUILT_DIR",
-                pdf_js_dist_dir,
-            ).replace("GR_FILE_ROOT_PATH", BASE_PATH)
-        with (dir_assets / "js" / "svg-pan-zoom.min.js").open() as fi:
-            self._svg_js = fi.read()
-
-        self._favicon = str(dir_assets / "img" / "favicon.svg")
+        (
+            self._css,
+            self._js,
+            self._pdf_view_js,
+            self._svg_js,
+            self._favicon,
+        ) = _load_assets(self.app_version, BASE_PATH)
 
         self.default_settings = SettingGroup(
             application=BaseSettingGroup(settings=settings.SETTINGS_APP),
@@ -72,24 +204,29 @@ class BaseApp:
         self._events: dict[str, list] = {}
 
         self.register_extensions()
+        ensure_schema()
         self.register_reasonings()
         self.initialize_indices()
 
         self.default_settings.reasoning.finalize()
         self.default_settings.index.finalize()
-        self.settings_state = gr.State(self.default_settings.flatten())
+        # the flattened defaults are read-only after boot, compute them once
+        self.flat_default_settings = self.default_settings.flatten()
+        self.settings_state = _gr().State(copy.copy(self.flat_default_settings))
 
         # Initialize user_id with session restoration
         initial_user_id = "default" if not self.f_user_management else None
         
-        # Try to restore session if user management is enabled
-        if self.f_user_management:
+        # Try to restore session if user management and tenants are enabled
+        if self.f_user_management and _SETTINGS_SNAPSHOT["KH_ENABLE_TENANT_SYSTEM"]:
             initial_user_id = self._restore_user_session()
         
-        self.user_id = gr.State(initial_user_id)
+        self.user_id = _gr().State(initial_user_id)
 
     def initialize_indices(self):
         """Create the index manager, start indices, and register to app settings"""
+        from ktem.index import IndexManager
+
         self.index_manager = IndexManager(self)
         self.index_manager.on_application_startup()
 
@@ -101,10 +238,10 @@ class BaseApp:
 
     def register_reasonings(self):
         """Register the reasoning components from app settings"""
-        if getattr(settings, "KH_REASONINGS", None) is None:
+        if _SETTINGS_SNAPSHOT["KH_REASONINGS"] is None:
             return
 
-        for value in settings.KH_REASONINGS:
+        for value in _SETTINGS_SNAPSHOT["KH_REASONINGS"]:
             reasoning_cls = import_dotted_string(value, safe=False)
             rid = reasoning_cls.get_info()["id"]
             reasonings[rid] = reasoning_cls
@@ -115,12 +252,10 @@ class BaseApp:
 
     def register_extensions(self):
         """Register installed extensions"""
-        self.exman = pluggy.PluginManager("ktem")
-        self.exman.add_hookspecs(extension_protocol)
-        self.exman.load_setuptools_entrypoints("ktem")
+        self.exman = _get_plugin_manager()
 
         # retrieve and register extension declarations
-        extension_declarations = self.exman.hook.ktem_declare_extensions()
+        extension_declarations = _get_extension_declarations()
         for extension_declaration in extension_declarations:
             # if already in database, with the same version: skip
 
@@ -180,36 +315,13 @@ class BaseApp:
         """Called when the app is created"""
 
     def make(self):
-        markmap_js = """
-        <script>
-            window.markmap = {
-                /** @type AutoLoaderOptions */
-                autoLoader: {
-                    toolbar: true, // Enable toolbar
-                },
-            };
-        </script>
-        """
-        external_js = (
-            "<script type='module' "
-            "src='https://cdn.skypack.dev/pdfjs-viewer-element'>"
-            "</script>"
-            "<script type='module' "
-            "src='https://cdnjs.cloudflare.com/ajax/libs/tributejs/5.1.3/tribute.min.js'>"  # noqa
-            f"{markmap_js}"
-            "<script src='https://cdn.jsdelivr.net/npm/markmap-autoloader@0.16'></script>"  # noqa
-            "<script src='https://cdn.jsdelivr.net/npm/minisearch@7.1.1/dist/umd/index.min.js'></script>"  # noqa
-            "</script>"
-            "<link rel='stylesheet' href='https://cdnjs.cloudflare.com/ajax/libs/tributejs/5.1.3/tribute.css'/>"  # noqa
-        )
-
-        with gr.Blocks(
+        with _gr().Blocks(
             theme=self._theme,
             css=self._css,
             title=self.app_name,
             analytics_enabled=False,
             js=self._js,
-            head=external_js,
+            head=_EXTERNAL_JS_HEAD,
         ) as demo:
             self.app = demo
             self.settings_state.render()
@@ -217,96 +329,93 @@ class BaseApp:
 
             self.ui()
 
-            self.declare_public_events()
-            self.subscribe_public_events()
-            self.register_events()
-            self.on_app_created()
+            # walk the page tree once, then run each life-cycle phase over it
+            pages = list(self._walk_pages())
+            for phase in ("declare", "subscribe", "register", "created"):
+                self._dispatch_lifecycle(phase, pages)
 
             demo.load(None, None, None, js=self._pdf_view_js)
 
         return demo
 
+    def _walk_pages(self):
+        """Yield all pages of the app, depth-first in declaration order"""
+        stack = self.child_pages[::-1]
+        while stack:
+            page = stack.pop()
+            yield page
+            stack.extend(page.child_pages[::-1])
+
+    def _dispatch_lifecycle(self, phase: str, pages: Optional[list] = None):
+        """Run one life-cycle phase on the app, then on each page in order
+
+        Args:
+            phase: one of "declare", "subscribe", "register", "created"
+            pages: the flattened page tree, walked from the app if not given
+        """
+        if pages is None:
+            pages = list(self._walk_pages())
+
+        if phase == "declare":
+            for node in [self, *pages]:
+                for event in node.public_events:
+                    self.declare_event(event)
+        elif phase == "subscribe":
+            for node in [self, *pages]:
+                node.on_subscribe_public_events()
+        elif phase == "register":
+            for node in [self, *pages]:
+                node.on_register_events()
+        elif phase == "created":
+            for node in [self, *pages]:
+                node._on_app_created()
+        else:
+            raise ValueError(f"Unknown life-cycle phase: {phase}")
+
     def declare_public_events(self):
         """Declare an event for the app"""
-        for event in self.public_events:
-            self.declare_event(event)
-
-        for value in self.__dict__.values():
-            if isinstance(value, BasePage):
-                value.declare_public_events()
+        self._dispatch_lifecycle("declare")
 
     def subscribe_public_events(self):
         """Subscribe to an event"""
-        self.on_subscribe_public_events()
-        for value in self.__dict__.values():
-            if isinstance(value, BasePage):
-                value.subscribe_public_events()
+        self._dispatch_lifecycle("subscribe")
 
     def register_events(self):
         """Register all events"""
-        self.on_register_events()
-        for value in self.__dict__.values():
-            if isinstance(value, BasePage):
-                value.register_events()
+        self._dispatch_lifecycle("register")
 
     def on_app_created(self):
         """Execute on app created callbacks"""
-        self._on_app_created()
-        for value in self.__dict__.values():
-            if isinstance(value, BasePage):
-                value.on_app_created()
+        self._dispatch_lifecycle("created")
     
     def _restore_user_session(self):
         """Restore user session from stored sessions"""
         try:
-            from theflow.settings import settings as flowsettings
-            KH_ENABLE_TENANT_SYSTEM = getattr(flowsettings, "KH_ENABLE_TENANT_SYSTEM", True)
+            from ktem.services import session_store
             
-            if not KH_ENABLE_TENANT_SYSTEM:
-                return None
-            
-            from ktem.services.tenant_auth import TenantAuthService
-            from pathlib import Path
-            import json
-            import datetime
-            
-            sessions_dir = Path(".kotaemon_sessions")
-            if not sessions_dir.exists():
+            sessions_dir = session_store.DEFAULT_SESSIONS_DIR
+            if not session_store.exists(sessions_dir):
                 return None
             
             # Find the most recent valid session
-            latest_session = None
-            latest_time = None
+            latest = session_store.latest_valid_session(sessions_dir)
+            if latest is None:
+                return None
             
-            for session_file in sessions_dir.glob("*.json"):
-                try:
-                    with open(session_file, 'r') as f:
-                        session_data = json.load(f)
-                    
-                    # Check if session is still valid
-                    expires_at = datetime.datetime.fromisoformat(session_data['expires_at'])
-                    if datetime.datetime.now() > expires_at:
-                        continue  # Skip expired sessions
-                    
-                    # Check if this is the most recent session
-                    created_at = datetime.datetime.fromisoformat(session_data['created_at'])
-                    if latest_time is None or created_at > latest_time:
-                        latest_time = created_at
-                        latest_session = session_data
-                        
-                except (json.JSONDecodeError, KeyError, ValueError):
-                    continue
+            # Only pay for the DB-backed service once there is a candidate
+            from ktem.services.tenant_auth import TenantAuthService
             
-            if latest_session:
+            session_id, session_data = latest
+            if session_data:
                 # Validate the user still exists and is active
-                user_id = latest_session['user_id']
+                user_id = session_data['user_id']
                 auth_user = TenantAuthService.get_user_by_id(user_id)
                 if auth_user and auth_user.is_active:
                     print(f"🔄 Restored session for user: {auth_user.username}")
                     return user_id
                 else:
                     # User no longer valid, clean up session
-                    TenantAuthService.delete_session(latest_session['session_id'])
+                    TenantAuthService.delete_session(session_id)
             
             return None
             
@@ -315,7 +424,7 @@ class BaseApp:
             return None
 
 
-class BasePage:
+class BasePage(_PageTreeNode):
     """The logic of the Kotaemon app"""
 
     public_events: list[str] = []
@@ -337,7 +446,7 @@ class BasePage:
 
     def as_gradio_component(
         self,
-    ) -> Optional[gr.components.Component | list[gr.components.Component]]:
+    ) -> Optional["gr.components.Component | list[gr.components.Component]"]:
         """Return the gradio components responsible for events
 
         Note: in ideal scenario, this method shouldn't be necessary.
@@ -345,15 +454,17 @@ class BasePage:
         return None
 
     def render(self):
+        block_cls = _gr().blocks.Block
         for value in self.__dict__.values():
-            if isinstance(value, gr.blocks.Block):
+            if isinstance(value, block_cls):
                 value.render()
             if isinstance(value, BasePage):
                 value.render()
 
     def unrender(self):
+        block_cls = _gr().blocks.Block
         for value in self.__dict__.values():
-            if isinstance(value, gr.blocks.Block):
+            if isinstance(value, block_cls):
                 value.unrender()
             if isinstance(value, BasePage):
                 value.unrender()
@@ -363,27 +474,23 @@ class BasePage:
         for event in self.public_events:
             self._app.declare_event(event)
 
-        for value in self.__dict__.values():
-            if isinstance(value, BasePage):
-                value.declare_public_events()
+        for page in self.child_pages:
+            page.declare_public_events()
 
     def subscribe_public_events(self):
         """Subscribe to an event"""
         self.on_subscribe_public_events()
-        for value in self.__dict__.values():
-            if isinstance(value, BasePage):
-                value.subscribe_public_events()
+        for page in self.child_pages:
+            page.subscribe_public_events()
 
     def register_events(self):
         """Register all events"""
         self.on_register_events()
-        for value in self.__dict__.values():
-            if isinstance(value, BasePage):
-                value.register_events()
+        for page in self.child_pages:
+            page.register_events()
 
     def on_app_created(self):
         """Execute on app created callbacks"""
         self._on_app_created()
-        for value in self.__dict__.values():
-            if isinstance(value, BasePage):
-                value.on_app_created()
+        for page in self.child_pages:
+            page.on_app_created()
@@ -2,11 +2,11 @@
 Tenant system configuration
 """
 
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, Callable
+from dataclasses import dataclass, asdict, field, fields
 
 
-@dataclass
+@dataclass(slots=True)
 class TenantSystemConfig:
     """Configuration for the tenant system"""
     
@@ -28,6 +28,8 @@ class TenantSystemConfig:
     enforce_tenant_isolation: bool = True
     
     # Legacy compatibility
+    # only applies when the tenant tables are created, the app refuses to start
+    # with it off against tables that still have the legacy columns
     maintain_legacy_tables: bool = True
     legacy_user_migration_enabled: bool = True
     
@@ -40,9 +42,24 @@ class TenantSystemConfig:
     max_failed_login_attempts: int = 5
     lockout_duration_minutes: int = 15
     
+    # Set when a value may differ from the (valid) defaults, see `validate`
+    _dirty: bool = field(default=False, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self._dirty = any(
+            getattr(self, f.name) != f.default for f in fields(self) if f.init
+        )
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name != '_dirty':
+            object.__setattr__(self, '_dirty', True)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
-        return asdict(self)
+        data = asdict(self)
+        data.pop('_dirty')
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'TenantSystemConfig':
@@ -50,7 +67,14 @@ class TenantSystemConfig:
         return cls(**data)
     
     def validate(self) -> None:
-        """Validate configuration"""
+        """Validate configuration
+
+        The defaults are known to be valid, so this is a no-op until a value
+        has been changed.
+        """
+        if not self._dirty:
+            return
+        
         if self.password_min_length < 4:
             raise ValueError("Password minimum length must be at least 4")
         
@@ -59,6 +83,8 @@ class TenantSystemConfig:
         
         if self.session_timeout_hours < 1:
             raise ValueError("Session timeout must be at least 1 hour")
+        
+        self._dirty = False
 
 
 # Default configuration instance
@@ -105,6 +131,37 @@ ENV_VAR_MAPPINGS = {
 }
 
 
+_TRUTHY = frozenset({'true', '1', 'yes', 'on'})
+_TRUTHY_INITIALS = frozenset('tT1yYoO')
+
+
+def _to_bool(value: str) -> bool:
+    # Every truthy spelling starts with one of these characters, so falsy
+    # values like "false"/"0"/"" are rejected without lower-casing
+    if value[:1] not in _TRUTHY_INITIALS:
+        return False
+    return value.lower() in _TRUTHY
+
+
+def _to_optional_str(value: str) -> Optional[str]:
+    return value or None
+
+
+# Env values are coerced according to the declared type of the config field,
+# resolved once here rather than by inspecting the current value on each load
+_COERCERS_BY_TYPE: Dict[Any, Callable[[str], Any]] = {
+    bool: _to_bool,
+    int: int,
+    str: str,
+    Optional[str]: _to_optional_str,
+}
+_ENV_COERCERS: Dict[str, Callable[[str], Any]] = {
+    f.name: _COERCERS_BY_TYPE[f.type]
+    for f in fields(TenantSystemConfig)
+    if f.name in ENV_VAR_MAPPINGS.values()
+}
+
+
 def load_config_from_env() -> TenantSystemConfig:
     """Load configuration from environment variables"""
     import os
@@ -114,18 +171,7 @@ def load_config_from_env() -> TenantSystemConfig:
     for env_var, config_attr in ENV_VAR_MAPPINGS.items():
         env_value = os.getenv(env_var)
         if env_value is not None:
-            # Get the current attribute to determine type
-            current_value = getattr(config, config_attr)
-            
-            # Convert based on type
-            if isinstance(current_value, bool):
-                setattr(config, config_attr, env_value.lower() in ('true', '1', 'yes', 'on'))
-            elif isinstance(current_value, int):
-                setattr(config, config_attr, int(env_value))
-            elif isinstance(current_value, str):
-                setattr(config, config_attr, env_value)
-            elif current_value is None:  # Optional strings
-                setattr(config, config_attr, env_value if env_value else None)
+            setattr(config, config_attr, _ENV_COERCERS[config_attr](env_value))
     
     config.validate()
     return config
@@ -6,6 +6,9 @@ from sqlalchemy import JSON, Column
 from sqlmodel import Field, SQLModel
 from tzlocal import get_localzone
 
+# resolved once, instead of re-reading the system zone for every new row
+_LOCAL_TZ = get_localzone()
+
 
 class BaseConversation(SQLModel):
     """Store the chat conversation between the user and the bot
@@ -26,7 +29,7 @@ class BaseConversation(SQLModel):
     )
     name: str = Field(
         default_factory=lambda: "Untitled - {}".format(
-            datetime.datetime.now(get_localzone()).strftime("%Y-%m-%d %H:%M:%S")
+            datetime.datetime.now(_LOCAL_TZ).strftime("%Y-%m-%d %H:%M:%S")
         )
     )
     user: str = Field(default="")  # For now we only have one user
@@ -37,10 +40,10 @@ class BaseConversation(SQLModel):
     data_source: dict = Field(default={}, sa_column=Column(JSON))
 
     date_created: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
     date_updated: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
 
 
@@ -1,4 +1,49 @@
+from contextlib import contextmanager
+
+from decouple import config
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlmodel import create_engine
 from theflow.settings import settings
 
-engine = create_engine(settings.KH_DATABASE)
+# SQLite has no server-side connection limits to size a pool against
+if make_url(settings.KH_DATABASE).get_backend_name() == "sqlite":
+    _pool_options = {}
+else:
+    # modest per-process defaults, as every worker process gets its own pool
+    # and the total has to stay within the server's max_connections (100 by
+    # default on PostgreSQL); raise them through the env vars where it allows
+    _pool_options = {
+        "pool_size": config("KH_DB_POOL_SIZE", default=10, cast=int),
+        "max_overflow": config("KH_DB_MAX_OVERFLOW", default=20, cast=int),
+        "pool_pre_ping": True,
+        "pool_recycle": config("KH_DB_POOL_RECYCLE", default=1800, cast=int),
+    }
+
+engine = create_engine(settings.KH_DATABASE, **_pool_options)
+
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # let readers go on while a write, e.g. the batched login times, commits
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed on `engine` inside the block
+
+    Yields:
+        a one-item list holding the running count
+    """
+    count = [0]
+
+    def _on_execute(*args, **kwargs):
+        count[0] += 1
+
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        yield count
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
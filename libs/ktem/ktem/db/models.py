@@ -1,31 +1,37 @@
 import ktem.db.base_models as base_models
 import ktem.db.tenant_models as tenant_models
+from ktem.config.tenant_config import load_config_from_env
 from ktem.db.engine import engine
+from sqlalchemy import inspect
 from sqlmodel import SQLModel
 from theflow.settings import settings
 from theflow.utils.modules import import_dotted_string
 
+# `settings` is loaded lazily; importing `engine` above has already read
+# KH_DATABASE, so all the user settings are in its __dict__ by now
+_settings = vars(settings)
+
 _base_conv = (
-    import_dotted_string(settings.KH_TABLE_CONV, safe=False)
-    if hasattr(settings, "KH_TABLE_CONV")
+    import_dotted_string(_settings["KH_TABLE_CONV"], safe=False)
+    if "KH_TABLE_CONV" in _settings
     else base_models.BaseConversation
 )
 
 _base_user = (
-    import_dotted_string(settings.KH_TABLE_USER, safe=False)
-    if hasattr(settings, "KH_TABLE_USER")
+    import_dotted_string(_settings["KH_TABLE_USER"], safe=False)
+    if "KH_TABLE_USER" in _settings
     else base_models.BaseUser
 )
 
 _base_settings = (
-    import_dotted_string(settings.KH_TABLE_SETTINGS, safe=False)
-    if hasattr(settings, "KH_TABLE_SETTINGS")
+    import_dotted_string(_settings["KH_TABLE_SETTINGS"], safe=False)
+    if "KH_TABLE_SETTINGS" in _settings
     else base_models.BaseSettings
 )
 
 _base_issue_report = (
-    import_dotted_string(settings.KH_TABLE_ISSUE_REPORT, safe=False)
-    if hasattr(settings, "KH_TABLE_ISSUE_REPORT")
+    import_dotted_string(_settings["KH_TABLE_ISSUE_REPORT"], safe=False)
+    if "KH_TABLE_ISSUE_REPORT" in _settings
     else base_models.BaseIssueReport
 )
 
@@ -46,20 +52,34 @@ class IssueReport(_base_issue_report, table=True):  # type: ignore
     """Record of issues"""
 
 
+# The legacy compatibility columns (`admin`, `user`) are only added to the
+# tenant tables when KH_MAINTAIN_LEGACY_TABLES is on. The flag only applies when
+# the tables are created: they are NOT NULL, so an existing database keeping
+# them can't be used with the flag off, see `ensure_schema`
+_maintain_legacy_tables = load_config_from_env().maintain_legacy_tables
+_tenant_user_bases: tuple = (tenant_models.BaseTenantUser,)
+_tenant_conv_bases: tuple = (tenant_models.BaseTenantConversation,)
+_tenant_settings_bases: tuple = (tenant_models.BaseTenantSettings,)
+if _maintain_legacy_tables:
+    _tenant_user_bases += (tenant_models.TenantUserLegacyFields,)
+    _tenant_conv_bases += (tenant_models.TenantConversationLegacyFields,)
+    _tenant_settings_bases += (tenant_models.TenantSettingsLegacyFields,)
+
+
 # Tenant-aware models
 class Tenant(tenant_models.BaseTenant, table=True):  # type: ignore
     """Tenant table for multi-tenancy"""
 
 
-class TenantUser(tenant_models.BaseTenantUser, table=True):  # type: ignore
+class TenantUser(*_tenant_user_bases, table=True):  # type: ignore
     """Enhanced user table with tenant support"""
 
 
-class TenantConversation(tenant_models.BaseTenantConversation, table=True):  # type: ignore
+class TenantConversation(*_tenant_conv_bases, table=True):  # type: ignore
     """Enhanced conversation table with tenant support"""
 
 
-class TenantSettings(tenant_models.BaseTenantSettings, table=True):  # type: ignore
+class TenantSettings(*_tenant_settings_bases, table=True):  # type: ignore
     """Enhanced settings table with tenant support"""
 
 
@@ -67,5 +87,70 @@ class TenantInvitation(tenant_models.TenantInvitation, table=True):  # type: ign
     """Tenant invitation table"""
 
 
-if not getattr(settings, "KH_ENABLE_ALEMBIC", False):
-    SQLModel.metadata.create_all(engine)
+_schema_ready = False
+
+# table name -> its legacy column, see `maintain_legacy_tables`
+_LEGACY_COLUMNS = {
+    TenantUser.__tablename__: "admin",
+    TenantConversation.__tablename__: "user",
+    TenantSettings.__tablename__: "user",
+}
+
+
+def _check_legacy_columns(inspector):
+    """Refuse to start without the legacy columns if the tables still have them
+
+    The models then leave those NOT NULL columns out of every INSERT, which
+    would fail at the first new user, conversation or settings row.
+    """
+    existing = set(inspector.get_table_names())
+    for table, column in _LEGACY_COLUMNS.items():
+        if table not in existing:
+            continue
+        if any(col["name"] == column for col in inspector.get_columns(table)):
+            raise RuntimeError(
+                f"Table '{table}' still has the legacy column '{column}', but "
+                "KH_MAINTAIN_LEGACY_TABLES is off. The flag only applies when "
+                "the tables are created: turn it back on, or drop the legacy "
+                "columns from the database first."
+            )
+
+
+def ensure_schema():
+    """Create the app tables and indexes if they don't exist yet
+
+    Run once per process, and skipped when the schema is managed by Alembic.
+    Kept out of module import so that callers only needing the model classes
+    don't open a DB connection.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    inspector = inspect(engine)
+    if not _maintain_legacy_tables:
+        _check_legacy_columns(inspector)
+
+    if not getattr(settings, "KH_ENABLE_ALEMBIC", False):
+        # list the existing tables in one introspection query, rather than
+        # letting create_all probe every table one by one
+        existing = set(inspector.get_table_names())
+        missing = [
+            table
+            for table in SQLModel.metadata.sorted_tables
+            if table.name not in existing
+        ]
+        if missing:
+            # keep checkfirst in case another worker creates them meanwhile
+            SQLModel.metadata.create_all(engine, tables=missing)
+
+        # create_all doesn't touch the existing tables, add the indexes they
+        # got since they were created
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing or not table.indexes:
+                continue
+            indexed = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexed:
+                    index.create(engine, checkfirst=True)
+    _schema_ready = True
@@ -1,12 +1,53 @@
 import datetime
+import os
+import threading
 import uuid
 from enum import Enum
 from typing import Optional, List
 
-from sqlalchemy import JSON, Column, ForeignKey, UniqueConstraint
+from sqlalchemy import JSON, Column, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.mutable import MutableDict
 from sqlmodel import Field, SQLModel, Relationship
 from tzlocal import get_localzone
 
+# resolved once, instead of re-reading the system zone for every new row
+_LOCAL_TZ = get_localzone()
+
+_ID_NBYTES = 16
+_ID_BUFFER_NBYTES = 1024
+_id_buffer = threading.local()
+
+
+def _reset_id_buffer():
+    """Drop the buffered random bytes so a forked child never reuses them"""
+    global _id_buffer
+    _id_buffer = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_buffer)
+
+
+def _uuid_hex() -> str:
+    """Random 32-char hex id, like `uuid.uuid4().hex`
+
+    Ids are sliced from a per-thread buffer filled by a single `os.urandom`
+    call, instead of one urandom read per row.
+    """
+    buffer = getattr(_id_buffer, "hex", "")
+    pos = getattr(_id_buffer, "pos", 0)
+    if pos >= len(buffer):
+        buffer = _id_buffer.hex = os.urandom(_ID_BUFFER_NBYTES).hex()
+        pos = 0
+    _id_buffer.pos = pos + 2 * _ID_NBYTES
+    return buffer[pos : pos + 2 * _ID_NBYTES]
+
+
+def _json_column() -> Column:
+    """JSON column stored as JSONB on Postgres, tracking in-place dict changes"""
+    return Column(MutableDict.as_mutable(JSON().with_variant(JSONB(), "postgresql")))
+
 
 class UserRole(str, Enum):
     """User roles within a tenant"""
@@ -38,18 +79,18 @@ class BaseTenant(SQLModel):
     __table_args__ = {"extend_existing": True}
     
     id: str = Field(
-        default_factory=lambda: uuid.uuid4().hex, primary_key=True, index=True
+        default_factory=_uuid_hex, primary_key=True, index=True
     )
     name: str = Field(min_length=1, max_length=255)
     domain: Optional[str] = Field(default=None, max_length=255, unique=True)
     status: TenantStatus = Field(default=TenantStatus.ACTIVE)
-    settings: dict = Field(default={}, sa_column=Column(JSON))
+    settings: dict = Field(default_factory=dict, sa_column=_json_column())
     
     date_created: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
     date_updated: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
 
 
@@ -59,6 +100,7 @@ class BaseTenantUser(SQLModel):
     Attributes:
         id: canonical id to identify the user
         username: the username of the user
+        username_lower: lower-cased username, for case-insensitive lookups
         email: email address of the user
         password: the hashed password of the user
         tenant_id: the tenant this user belongs to
@@ -69,20 +111,27 @@ class BaseTenantUser(SQLModel):
     
     __table_args__ = (
         UniqueConstraint('username', 'tenant_id', name='unique_username_per_tenant'),
+        # also serves the (email, tenant_id) login lookup
         UniqueConstraint('email', 'tenant_id', name='unique_email_per_tenant'),
+        # the username login lookup, active check included, so an inactive
+        # match is rejected without reading the row
+        Index('ix_tu_username_lower_tenant', 'username_lower', 'tenant_id', 'is_active'),
+        # covers the paged listing of a tenant's users, in id order
+        Index('ix_tu_tenant_active', 'tenant_id', 'is_active', 'id'),
         {"extend_existing": True}
     )
     
     id: str = Field(
-        default_factory=lambda: uuid.uuid4().hex, primary_key=True, index=True
+        default_factory=_uuid_hex, primary_key=True, index=True
     )
     username: str = Field(min_length=1, max_length=255)
-    username_lower: str = Field(max_length=255, index=True)
+    # indexed by `ix_tu_username_lower_tenant`
+    username_lower: str = Field(max_length=255)
     email: str = Field(max_length=255)
     password: str
     
-    # Tenant relationship
-    tenant_id: str = Field(foreign_key="tenant.id", index=True)
+    # Tenant relationship, indexed by `ix_tu_tenant_active`
+    tenant_id: str = Field(foreign_key="tenant.id")
     
     # Role within tenant
     role: UserRole = Field(default=UserRole.USER)
@@ -93,13 +142,16 @@ class BaseTenantUser(SQLModel):
     # Audit fields
     last_login: Optional[datetime.datetime] = Field(default=None)
     date_created: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
     date_updated: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
+
+
+class TenantUserLegacyFields(SQLModel):
+    """Legacy columns of the tenant user table, see `maintain_legacy_tables`"""
     
-    # Legacy compatibility
     admin: bool = Field(default=False, description="Legacy admin field for backward compatibility")
 
 
@@ -120,11 +172,11 @@ class BaseTenantConversation(SQLModel):
     __table_args__ = {"extend_existing": True}
     
     id: str = Field(
-        default_factory=lambda: uuid.uuid4().hex, primary_key=True, index=True
+        default_factory=_uuid_hex, primary_key=True, index=True
     )
     name: str = Field(
         default_factory=lambda: "Untitled - {}".format(
-            datetime.datetime.now(get_localzone()).strftime("%Y-%m-%d %H:%M:%S")
+            datetime.datetime.now(_LOCAL_TZ).strftime("%Y-%m-%d %H:%M:%S")
         )
     )
     
@@ -135,16 +187,20 @@ class BaseTenantConversation(SQLModel):
     is_public: bool = Field(default=False, description="Public within tenant")
     
     # contains messages + current files + chat_suggestions
-    data_source: dict = Field(default={}, sa_column=Column(JSON))
+    data_source: dict = Field(default_factory=dict, sa_column=_json_column())
     
     date_created: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
     date_updated: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
+
+
+
+class TenantConversationLegacyFields(SQLModel):
+    """Legacy columns of the tenant conversation table, see `maintain_legacy_tables`"""
     
-    # Legacy compatibility
     user: str = Field(default="", description="Legacy user field for backward compatibility")
 
 
@@ -162,17 +218,21 @@ class BaseTenantSettings(SQLModel):
     __table_args__ = {"extend_existing": True}
     
     id: str = Field(
-        default_factory=lambda: uuid.uuid4().hex, primary_key=True, index=True
+        default_factory=_uuid_hex, primary_key=True, index=True
     )
     
     # User and tenant relationships
     user_id: Optional[str] = Field(default=None, foreign_key="tenantuser.id")
     tenant_id: str = Field(foreign_key="tenant.id", index=True)
     
-    setting: dict = Field(default={}, sa_column=Column(JSON))
+    setting: dict = Field(default_factory=dict, sa_column=_json_column())
     is_tenant_wide: bool = Field(default=False, description="Tenant-wide vs user-specific settings")
+
+
+
+class TenantSettingsLegacyFields(SQLModel):
+    """Legacy columns of the tenant settings table, see `maintain_legacy_tables`"""
     
-    # Legacy compatibility
     user: str = Field(default="", description="Legacy user field for backward compatibility")
 
 
@@ -191,10 +251,14 @@ class TenantInvitation(SQLModel):
         is_used: whether the invitation has been used
     """
     
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # serves the pending-first listing of a tenant's invitations
+        Index('ix_invite_tenant_status', 'tenant_id', 'is_used', 'expires_at'),
+        {"extend_existing": True}
+    )
     
     id: str = Field(
-        default_factory=lambda: uuid.uuid4().hex, primary_key=True, index=True
+        default_factory=_uuid_hex, primary_key=True, index=True
     )
     email: str = Field(max_length=255, index=True)
     tenant_id: str = Field(foreign_key="tenant.id", index=True)
@@ -206,11 +270,11 @@ class TenantInvitation(SQLModel):
     )
     
     expires_at: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone()) + datetime.timedelta(days=7)
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ) + datetime.timedelta(days=7)
     )
     accepted_at: Optional[datetime.datetime] = Field(default=None)
     is_used: bool = Field(default=False)
     
     date_created: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(get_localzone())
+        default_factory=lambda: datetime.datetime.now(_LOCAL_TZ)
     )
@@ -1,45 +1,149 @@
-import gradio as gr
+import sys
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+
 from decouple import config
 from ktem.app import BaseApp
-from ktem.pages.chat import ChatPage
-from ktem.pages.tenant_chat import TenantChatPage
-from ktem.pages.help import HelpPage
-from ktem.pages.resources import ResourcesTab
-from ktem.pages.settings import SettingsPage
-from ktem.pages.setup import SetupPage
-from ktem.pages.tenant import TenantPage
-from ktem.pages.tenant_login import TenantLoginPage
+from ktem.db.models import ensure_schema
+from ktem.db.tenant_models import UserRole
 from ktem.services.tenant_auth import TenantAuthService, TenantAuthMiddleware
-from ktem.utils.tenant_migration import run_migration_if_needed, ensure_default_tenant
 from theflow.settings import settings as flowsettings
 
-KH_DEMO_MODE = getattr(flowsettings, "KH_DEMO_MODE", False)
-KH_SSO_ENABLED = getattr(flowsettings, "KH_SSO_ENABLED", False)
-KH_ENABLE_FIRST_SETUP = getattr(flowsettings, "KH_ENABLE_FIRST_SETUP", False)
+
+@dataclass(frozen=True, slots=True)
+class _KHFlags:
+    """Feature flags of the main app, read from flowsettings once at import"""
+
+    demo_mode: bool
+    sso: bool
+    first_setup: bool
+    tenant: bool
+
+
+KH = _KHFlags(
+    demo_mode=getattr(flowsettings, "KH_DEMO_MODE", False),
+    sso=getattr(flowsettings, "KH_SSO_ENABLED", False),
+    first_setup=getattr(flowsettings, "KH_ENABLE_FIRST_SETUP", False),
+    tenant=getattr(flowsettings, "KH_ENABLE_TENANT_SYSTEM", True),
+)
+
+# flipped once the first setup completes, so it can't live in KH
 KH_APP_DATA_EXISTS = getattr(flowsettings, "KH_APP_DATA_EXISTS", True)
-KH_ENABLE_TENANT_SYSTEM = getattr(flowsettings, "KH_ENABLE_TENANT_SYSTEM", True)
 
 # override first setup setting
 if config("KH_FIRST_SETUP", default=False, cast=bool):
     KH_APP_DATA_EXISTS = False
 
-# Run tenant migration if needed on startup
-if KH_ENABLE_TENANT_SYSTEM:
-    try:
-        migration_ran = run_migration_if_needed()
-        if not migration_ran:
-            # If no migration was needed, ensure default tenant exists
-            ensure_default_tenant()
-    except Exception as e:
-        print(f"Warning: Tenant system initialization failed: {e}")
-        print("Continuing with legacy system...")
+# The tab keys (also their elem_id/id) are interned, so the key comparisons
+# and lookups of the sign-in toggle hit the identity fast path
+_K_LOGIN = sys.intern("login-tab")
+_K_CHAT = sys.intern("chat-tab")
+_K_TENANT = sys.intern("tenant-tab")
+_K_INDICES = sys.intern("indices-tab")
+_K_RESOURCES = sys.intern("resources-tab")
+_K_SETTINGS = sys.intern("settings-tab")
+_K_HELP = sys.intern("help-tab")
+
+# Who can see a tab once signed in. Tabs not listed (resources, settings, help,
+# indices...) are shown to admins and super admins.
+TAB_LOGIN = "login"
+TAB_SUPER_ADMIN = "super_admin"
+TAB_ADMIN = "admin"
+TAB_ALL = "all"
+_TAB_ROLES = {
+    _K_LOGIN: TAB_LOGIN,
+    _K_TENANT: TAB_SUPER_ADMIN,
+    _K_CHAT: TAB_ALL,
+}
+
+_SCROLLABLE = ("fill-main-area-height", "scrollable")
+
+# The main tabs in display order: label, elem_id (also used as the tab id),
+# elem_classes and the App method rendering the page. The index tabs take the
+# slot without a render method, see `App._render_index_tabs`.
+_TAB_SPECS = (
+    ("Chat", _K_CHAT, (), "_render_chat_page"),
+    ("Tenant", _K_TENANT, (), "_render_tenant_page"),
+    (None, _K_INDICES, (), None),
+    ("Resources", _K_RESOURCES, _SCROLLABLE, "_render_resources_page"),
+    ("Settings", _K_SETTINGS, _SCROLLABLE, "_render_settings_page"),
+    ("Help", _K_HELP, _SCROLLABLE, "_render_help_page"),
+)
+_DISABLED_TABS = frozenset(
+    ((_K_RESOURCES, _K_SETTINGS) if KH.demo_mode else ())
+    + ((_K_RESOURCES,) if KH.sso else ())
+)
+
+_bootstrap_lock = threading.Lock()
+_bootstrapped = False
+
+
+def _bootstrap_tenant_system():
+    """Run the tenant migration, or seed the default tenant, once per process"""
+    global _bootstrapped
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return
+        _bootstrapped = True
+
+        from ktem.utils.tenant_migration import (
+            ensure_default_tenant,
+            run_migration_if_needed,
+        )
+
+        # the migration needs the tables in place
+        ensure_schema()
+        try:
+            migration_ran = run_migration_if_needed()
+            if not migration_ran:
+                # If no migration was needed, ensure default tenant exists
+                ensure_default_tenant()
+        except Exception as e:
+            print(f"Warning: Tenant system initialization failed: {e}")
+            print("Continuing with legacy system...")
+
+
+_ROLE_DISPLAY = {role: role.value.replace("_", " ").title() for role in UserRole}
+_TENANT_USER_INFO = "**{u}** ({r}) • {t}".format
+_LEGACY_USER_INFO = "**{u}** ({r})".format
+
+_LEGACY_AUTH = None
+
+
+def _get_legacy_auth():
+    """Get the engine and user lookup statement of the legacy sign-in
+
+    They are imported and built on the first legacy sign-in only.
+    """
+    global _LEGACY_AUTH
+    if _LEGACY_AUTH is None:
+        from ktem.db.engine import engine
+        from ktem.db.models import User
+        from sqlalchemy import bindparam
+        from sqlmodel import select
+
+        _LEGACY_AUTH = (engine, select(User).where(User.id == bindparam("uid")))
+    return _LEGACY_AUTH
+
+
+@lru_cache(maxsize=2)
+def _visibility(visible):
+    """Shared `gr.update(visible=...)`
+
+    gradio only pops "value" out of the update dicts it receives, so the
+    visibility-only ones can be reused across events.
+    """
+    import gradio as gr
+
+    return gr.update(visible=visible)
 
 
 def toggle_first_setup_visibility():
     global KH_APP_DATA_EXISTS
-    is_first_setup = not KH_DEMO_MODE and not KH_APP_DATA_EXISTS
+    is_first_setup = not KH.demo_mode and not KH_APP_DATA_EXISTS
     KH_APP_DATA_EXISTS = True
-    return gr.update(visible=is_first_setup), gr.update(visible=not is_first_setup)
+    return _visibility(is_first_setup), _visibility(not is_first_setup)
 
 
 class App(BaseApp):
@@ -56,8 +160,43 @@ class App(BaseApp):
         - Register events
     """
 
+    # BaseApp keeps a __dict__, the attributes set by App itself live in slots
+    __slots__ = (
+        "_tenant_system",
+        "_tabs",
+        "header",
+        "user_info",
+        "logout_btn",
+        "tabs",
+        "login_page",
+        "chat_page",
+        "tenant_page",
+        "help_page",
+        "settings_page",
+        "resources_page",
+        "setup_page",
+        "setup_page_wrapper",
+        "_index_pages",
+        "_tab_keys",
+        "_tab_role_req",
+        "_cached_unauth_tabs",
+        "_cached_unauth_headers",
+        "_logged_in_tabs_updates",
+        "_auth_event_outputs",
+    )
+
+    def __init__(self):
+        self._tenant_system = KH.tenant
+        super().__init__()
+        if self._tenant_system:
+            # before any page is served: sign-ins need the migrated tables, and
+            # the first-tenant setup must see the seeded default tenant
+            _bootstrap_tenant_system()
+
     def ui(self):
         """Render the UI"""
+        import gradio as gr
+
         self._tabs = {}
 
         # Add header with user info and logout button
@@ -76,268 +215,219 @@ class App(BaseApp):
         with gr.Tabs() as self.tabs:
             if self.f_user_management:
                 # Use tenant login system if enabled
-                if KH_ENABLE_TENANT_SYSTEM:
+                if self._tenant_system:
+                    from ktem.pages.tenant_login import TenantLoginPage
                     with gr.Tab(
-                        "Welcome", elem_id="login-tab", id="login-tab"
-                    ) as self._tabs["login-tab"]:
+                        "Welcome", elem_id=_K_LOGIN, id=_K_LOGIN
+                    ) as self._tabs[_K_LOGIN]:
                         self.login_page = TenantLoginPage(self)
                 else:
                     from ktem.pages.login import LoginPage
                     with gr.Tab(
-                        "Welcome", elem_id="login-tab", id="login-tab"
-                    ) as self._tabs["login-tab"]:
+                        "Welcome", elem_id=_K_LOGIN, id=_K_LOGIN
+                    ) as self._tabs[_K_LOGIN]:
                         self.login_page = LoginPage(self)
 
-            with gr.Tab(
-                "Chat",
-                elem_id="chat-tab",
-                id="chat-tab",
-                visible=not self.f_user_management,
-            ) as self._tabs["chat-tab"]:
-                # Use tenant-aware chat page if tenant system is enabled
-                if KH_ENABLE_TENANT_SYSTEM:
-                    self.chat_page = TenantChatPage(self)
-                else:
-                    self.chat_page = ChatPage(self)
+            for label, elem_id, elem_classes, render in _TAB_SPECS:
+                if render is None:
+                    self._render_index_tabs()
+                elif elem_id not in _DISABLED_TABS:
+                    with gr.Tab(
+                        label,
+                        elem_id=elem_id,
+                        id=elem_id,
+                        visible=not self.f_user_management,
+                        elem_classes=list(elem_classes),
+                    ) as self._tabs[elem_id]:
+                        getattr(self, render)()
+
+        if KH.first_setup:
+            from ktem.pages.setup import SetupPage
+            with gr.Column(visible=False) as self.setup_page_wrapper:
+                self.setup_page = SetupPage(self)
+
+        # The tab updates only depend on the tab set and the user's role, so
+        # build them once instead of on every sign-in/out
+        self._tab_keys = tuple(self._tabs.keys())
+        self._cached_unauth_tabs = tuple(
+            [_visibility(k == _K_LOGIN) for k in self._tab_keys]
+            + [gr.update(selected=_K_LOGIN)]
+        )
+        self._cached_unauth_headers = (
+            gr.update(value="", visible=False),  # user_info
+            _visibility(False),  # logout_btn
+        )
+        self._logged_in_tabs_updates = {}
+        self._tab_role_req = {k: _TAB_ROLES.get(k, TAB_ADMIN) for k in self._tab_keys}
+
+        if self.f_user_management:
+            # gradio 4 wraps any non-list `outputs` as a single component, so
+            # keep a list, shared by the sign-in/out and logout events
+            self._auth_event_outputs = [
+                *self._tabs.values(),
+                self.tabs,
+                self.user_info,
+                self.logout_btn,
+            ]
+
+    def _render_chat_page(self):
+        # Use tenant-aware chat page if tenant system is enabled
+        if self._tenant_system:
+            from ktem.pages.tenant_chat import TenantChatPage
+            self.chat_page = TenantChatPage(self)
+        else:
+            from ktem.pages.chat import ChatPage
+            self.chat_page = ChatPage(self)
+
+    def _render_tenant_page(self):
+        from ktem.pages.tenant import TenantPage
+        self.tenant_page = TenantPage(self)
 
+    def _render_index_tabs(self):
+        import gradio as gr
+
+        self._index_pages = {}
+        if len(self.index_manager.indices) == 1:
+            for index in self.index_manager.indices:
+                with gr.Tab(
+                    f"{index.name}",
+                    elem_id=_K_INDICES,
+                    elem_classes=[
+                        "fill-main-area-height",
+                        "scrollable",
+                        "indices-tab",
+                    ],
+                    id=_K_INDICES,
+                    visible=not self.f_user_management and not KH.demo_mode,
+                ) as self._tabs[f"{index.id}-tab"]:
+                    page = index.get_index_page_ui()
+                    self._index_pages[index.id] = page
+                    self.add_child_page(("index", index.id), page)
+        elif len(self.index_manager.indices) > 1:
             with gr.Tab(
-                "Tenant",
-                elem_id="tenant-tab",
-                id="tenant-tab",
-                visible=not self.f_user_management,
-            ) as self._tabs["tenant-tab"]:
-                self.tenant_page = TenantPage(self)
-
-            if len(self.index_manager.indices) == 1:
+                "Files",
+                elem_id=_K_INDICES,
+                elem_classes=["fill-main-area-height", "scrollable", "indices-tab"],
+                id=_K_INDICES,
+                visible=not self.f_user_management and not KH.demo_mode,
+            ) as self._tabs[_K_INDICES]:
                 for index in self.index_manager.indices:
                     with gr.Tab(
-                        f"{index.name}",
-                        elem_id="indices-tab",
-                        elem_classes=[
-                            "fill-main-area-height",
-                            "scrollable",
-                            "indices-tab",
-                        ],
-                        id="indices-tab",
-                        visible=not self.f_user_management and not KH_DEMO_MODE,
+                        index.name,
+                        elem_id=f"{index.id}-tab",
                     ) as self._tabs[f"{index.id}-tab"]:
                         page = index.get_index_page_ui()
-                        setattr(self, f"_index_{index.id}", page)
-            elif len(self.index_manager.indices) > 1:
-                with gr.Tab(
-                    "Files",
-                    elem_id="indices-tab",
-                    elem_classes=["fill-main-area-height", "scrollable", "indices-tab"],
-                    id="indices-tab",
-                    visible=not self.f_user_management and not KH_DEMO_MODE,
-                ) as self._tabs["indices-tab"]:
-                    for index in self.index_manager.indices:
-                        with gr.Tab(
-                            index.name,
-                            elem_id=f"{index.id}-tab",
-                        ) as self._tabs[f"{index.id}-tab"]:
-                            page = index.get_index_page_ui()
-                            setattr(self, f"_index_{index.id}", page)
-
-            if not KH_DEMO_MODE:
-                if not KH_SSO_ENABLED:
-                    with gr.Tab(
-                        "Resources",
-                        elem_id="resources-tab",
-                        id="resources-tab",
-                        visible=not self.f_user_management,
-                        elem_classes=["fill-main-area-height", "scrollable"],
-                    ) as self._tabs["resources-tab"]:
-                        self.resources_page = ResourcesTab(self)
+                        self._index_pages[index.id] = page
+                        self.add_child_page(("index", index.id), page)
 
-                with gr.Tab(
-                    "Settings",
-                    elem_id="settings-tab",
-                    id="settings-tab",
-                    visible=not self.f_user_management,
-                    elem_classes=["fill-main-area-height", "scrollable"],
-                ) as self._tabs["settings-tab"]:
-                    self.settings_page = SettingsPage(self)
+    def _render_resources_page(self):
+        from ktem.pages.resources import ResourcesTab
+        self.resources_page = ResourcesTab(self)
 
-            with gr.Tab(
-                "Help",
-                elem_id="help-tab",
-                id="help-tab",
-                visible=not self.f_user_management,
-                elem_classes=["fill-main-area-height", "scrollable"],
-            ) as self._tabs["help-tab"]:
-                self.help_page = HelpPage(self)
-
-        if KH_ENABLE_FIRST_SETUP:
-            with gr.Column(visible=False) as self.setup_page_wrapper:
-                self.setup_page = SetupPage(self)
+    def _render_settings_page(self):
+        from ktem.pages.settings import SettingsPage
+        self.settings_page = SettingsPage(self)
 
-    def on_subscribe_public_events(self):
-        if self.f_user_management:
-            def toggle_login_visibility(user_id):
-                if not user_id:
-                    tabs_result = list(
-                        (
-                            gr.update(visible=True)
-                            if k == "login-tab"
-                            else gr.update(visible=False)
-                        )
-                        for k in self._tabs.keys()
-                    ) + [gr.update(selected="login-tab")]
-                    
-                    # Hide header when logged out
-                    header_result = [
-                        gr.update(value="", visible=False),  # user_info
-                        gr.update(visible=False)  # logout_btn
-                    ]
-                    
-                    return tabs_result + header_result
-
-                # Use tenant system if enabled
-                if KH_ENABLE_TENANT_SYSTEM:
-                    auth_user = TenantAuthService.get_user_by_id(user_id)
-                    if auth_user is None:
-                        tabs_result = list(
-                            (
-                                gr.update(visible=True)
-                                if k == "login-tab"
-                                else gr.update(visible=False)
-                            )
-                            for k in self._tabs.keys()
-                        ) + [gr.update(selected="login-tab")]
-                        
-                        # Hide header when auth fails
-                        header_result = [
-                            gr.update(value="", visible=False),  # user_info
-                            gr.update(visible=False)  # logout_btn
-                        ]
-                        
-                        return tabs_result + header_result
-                    
-                    # Role-based access control
-                    is_super_admin = auth_user.is_super_admin
-                    is_admin = auth_user.is_admin
-                    is_user = auth_user.role.value == "user"
-                else:
-                    # Legacy user system
-                    from ktem.db.engine import engine
-                    from ktem.db.models import User
-                    from sqlmodel import Session, select
-                    
-                    with Session(engine) as session:
-                        user = session.exec(select(User).where(User.id == user_id)).first()
-                        if user is None:
-                            tabs_result = list(
-                                (
-                                    gr.update(visible=True)
-                                    if k == "login-tab"
-                                    else gr.update(visible=False)
-                                )
-                                for k in self._tabs.keys()
-                            ) + [gr.update(selected="login-tab")]
-                            
-                            # Hide header when legacy auth fails
-                            header_result = [
-                                gr.update(value="", visible=False),  # user_info
-                                gr.update(visible=False)  # logout_btn
-                            ]
-                            
-                            return tabs_result + header_result
-
-                        # Legacy system - treat legacy admin as super admin for compatibility
-                        is_super_admin = user.admin
-                        is_admin = user.admin
-                        is_user = not user.admin
-
-                tabs_update = []
-                for k in self._tabs.keys():
-                    if k == "login-tab":
-                        tabs_update.append(gr.update(visible=False))
-                    elif k == "tenant-tab":
-                        # Only super admin can see tenant tab
-                        tabs_update.append(gr.update(visible=is_super_admin))
-                    elif k == "resources-tab":
-                        # Admin and super admin can see resources
-                        tabs_update.append(gr.update(visible=is_admin))
-                    elif k == "settings-tab":
-                        # Admin and super admin can see settings
-                        tabs_update.append(gr.update(visible=is_admin))
-                    elif k == "help-tab":
-                        # Admin and super admin can see help
-                        tabs_update.append(gr.update(visible=is_admin))
-                    elif "indices-tab" in k:
-                        # Admin and super admin can see file/indices tabs
-                        tabs_update.append(gr.update(visible=is_admin))
-                    elif k == "chat-tab":
-                        # Everyone can see chat
-                        tabs_update.append(gr.update(visible=True))
-                    else:
-                        # Default: show to admin and super admin
-                        tabs_update.append(gr.update(visible=is_admin))
-
-                tabs_update.append(gr.update(selected="chat-tab"))
-
-                # Add header updates for successful login
-                if KH_ENABLE_TENANT_SYSTEM:
-                    # Show user info with role
-                    role_display = auth_user.role.value.replace('_', ' ').title()
-                    user_info_text = f"**{auth_user.username}** ({role_display}) • {auth_user.tenant_name}"
-                else:
-                    # Legacy system
-                    role_display = "Admin" if user.admin else "User"
-                    user_info_text = f"**{user.username}** ({role_display})"
-                
-                header_result = [
-                    gr.update(value=user_info_text, visible=True),  # user_info
-                    gr.update(visible=True)  # logout_btn
-                ]
+    def _render_help_page(self):
+        from ktem.pages.help import HelpPage
+        self.help_page = HelpPage(self)
 
-                return tabs_update + header_result
+    def _unauth_response(self):
+        """Send the user back to the login tab and hide the header"""
+        # gradio pops "value" out of the update dicts it receives, so hand it
+        # copies of the header updates
+        return [*self._cached_unauth_tabs, *map(dict, self._cached_unauth_headers)]
 
-            self.subscribe_event(
-                name="onSignIn",
-                definition={
-                    "fn": toggle_login_visibility,
-                    "inputs": [self.user_id],
-                    "outputs": list(self._tabs.values()) + [self.tabs] + [self.user_info, self.logout_btn],
-                    "show_progress": "hidden",
-                },
-            )
+    def _logged_in_tabs_update(self, is_super_admin, is_admin):
+        """Get the tab updates (and tab selector) for a signed-in role"""
+        import gradio as gr
 
-            self.subscribe_event(
-                name="onSignOut",
-                definition={
-                    "fn": toggle_login_visibility,
-                    "inputs": [self.user_id],
-                    "outputs": list(self._tabs.values()) + [self.tabs] + [self.user_info, self.logout_btn],
-                    "show_progress": "hidden",
-                },
-            )
-            
-            # Add logout button functionality
-            def handle_logout():
-                # Clear user session from database
-                try:
-                    from ktem.services.tenant_auth import TenantAuthService
-                    # Note: In a real implementation, we'd track the session ID
-                    # For now, we'll just return None to clear the gradio state
-                    print("🚪 User logged out")
-                except Exception as e:
-                    print(f"⚠️ Error during logout: {e}")
-                return None
+        role = (is_super_admin, is_admin)
+        if role in self._logged_in_tabs_updates:
+            return self._logged_in_tabs_updates[role]
+
+        role_flags = {
+            TAB_LOGIN: False,
+            TAB_SUPER_ADMIN: is_super_admin,
+            TAB_ADMIN: is_admin,
+            TAB_ALL: True,
+        }
+        tabs_update = [
+            _visibility(role_flags[self._tab_role_req[k]]) for k in self._tab_keys
+        ]
+        tabs_update.append(gr.update(selected=_K_CHAT))
+
+        self._logged_in_tabs_updates[role] = tuple(tabs_update)
+        return self._logged_in_tabs_updates[role]
+
+    def get_auth_user(self, user_id):
+        """Resolve the signed-in tenant user, shared by all the pages
+
+        The login toggle and the tenant pages all resolve the same user on
+        page load; they go through the service's short-lived user cache,
+        which is process-wide and dropped on any user or tenant change.
+        """
+        return TenantAuthService.get_cached_user(user_id)
+
+    def _toggle_login_visibility(self, user_id):
+        import gradio as gr
+
+        if not user_id:
+            return self._unauth_response()
+
+        # Use tenant system if enabled
+        if self._tenant_system:
+            auth_user = self.get_auth_user(user_id)
+            if auth_user is None:
+                return self._unauth_response()
             
-            self.logout_btn.click(
-                fn=handle_logout,
-                outputs=[self.user_id],
-                show_progress="hidden"
-            ).then(
-                fn=toggle_login_visibility,
-                inputs=[self.user_id],
-                outputs=list(self._tabs.values()) + [self.tabs] + [self.user_info, self.logout_btn],
-                show_progress="hidden"
+            # Role-based access control
+            is_super_admin = auth_user.is_super_admin
+            is_admin = auth_user.is_admin
+            is_user = auth_user.role.value == "user"
+        else:
+            # Legacy user system, only the user row is needed so read
+            # it straight from a pooled connection
+            engine, user_stmt = _get_legacy_auth()
+            with engine.connect() as conn:
+                user = conn.execute(user_stmt, {"uid": user_id}).first()
+            if user is None:
+                return self._unauth_response()
+
+            # Legacy system - treat legacy admin as super admin for compatibility
+            is_super_admin = user.admin
+            is_admin = user.admin
+            is_user = not user.admin
+
+        # Add header updates for successful login
+        if self._tenant_system:
+            # Show user info with role
+            user_info_text = _TENANT_USER_INFO(
+                u=auth_user.username,
+                r=_ROLE_DISPLAY[auth_user.role],
+                t=auth_user.tenant_name,
+            )
+        else:
+            # Legacy system
+            user_info_text = _LEGACY_USER_INFO(
+                u=user.username, r="Admin" if user.admin else "User"
             )
 
-        if KH_ENABLE_FIRST_SETUP:
+        return [
+            *self._logged_in_tabs_update(is_super_admin, is_admin),
+            gr.update(value=user_info_text, visible=True),  # user_info
+            _visibility(True),  # logout_btn
+        ]
+
+    def _handle_logout(self, user_id):
+        # only drop the user logging out, without an id this would clear the
+        # cached entries of everyone
+        if user_id:
+            TenantAuthService.invalidate_user_cache(user_id)
+        return None
+
+    def _subscribe_first_setup(self):
+        if KH.first_setup:
             self.subscribe_event(
                 name="onFirstSetupComplete",
                 definition={
@@ -348,10 +438,59 @@ class App(BaseApp):
                 },
             )
 
+    def on_subscribe_public_events(self):
+        if not self.f_user_management:
+            return self._subscribe_first_setup()
+
+        self.subscribe_event(
+            name="onSignIn",
+            definition={
+                "fn": self._toggle_login_visibility,
+                "inputs": [self.user_id],
+                "outputs": self._auth_event_outputs,
+                "show_progress": "hidden",
+            },
+        )
+
+        self.subscribe_event(
+            name="onSignOut",
+            definition={
+                "fn": self._toggle_login_visibility,
+                "inputs": [self.user_id],
+                "outputs": self._auth_event_outputs,
+                "show_progress": "hidden",
+            },
+        )
+        
+        # Add logout button functionality
+        self.logout_btn.click(
+            fn=self._handle_logout,
+            inputs=[self.user_id],
+            outputs=[self.user_id],
+            show_progress="hidden"
+        ).then(
+            fn=self._toggle_login_visibility,
+            inputs=[self.user_id],
+            outputs=self._auth_event_outputs,
+            show_progress="hidden"
+        )
+
+        self._subscribe_first_setup()
+
+    def on_register_events(self):
+        # Only the help page can be deferred: it reads its documents (possibly
+        # over the network) when its tab is first opened. The other pages take
+        # part in the app's event life-cycle, so they are built upfront.
+        self._tabs[_K_HELP].select(
+            self.help_page.load,
+            outputs=self.help_page.outputs,
+            show_progress="hidden",
+        )
+
     def _on_app_created(self):
         """Called when the app is created"""
 
-        if KH_ENABLE_FIRST_SETUP:
+        if KH.first_setup:
             self.app.load(
                 toggle_first_setup_visibility,
                 inputs=[],
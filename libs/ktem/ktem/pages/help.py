@@ -1,4 +1,3 @@
-from importlib.metadata import version
 from pathlib import Path
 
 import gradio as gr
@@ -49,19 +48,12 @@ class HelpPage:
 
         self.changelogs_cache_dir.mkdir(parents=True, exist_ok=True)
 
-        about_md_dir = self.doc_dir / "about.md"
-        if about_md_dir.exists():
-            with (self.doc_dir / "about.md").open(encoding="utf-8") as fi:
-                about_md = fi.read()
-        else:  # fetch from remote
-            about_md = get_remote_doc(
-                f"{self.remote_content_url}/v{self.app_version}/docs/about.md"
-            )
-        if about_md:
-            with gr.Accordion("About"):
-                if self.app_version:
-                    about_md = f"Version: {self.app_version}\n\n{about_md}"
-                gr.Markdown(about_md)
+        # The documents may have to be fetched over the network, so only lay
+        # out the accordions here and fill them in `load`, on first visit
+        self._docs = None
+
+        with gr.Accordion("About", visible=False) as self.about_accordion:
+            self.about_md = gr.Markdown()
 
         if KH_DEMO_MODE:
             with gr.Accordion("Create Your Own Space"):
@@ -79,41 +71,71 @@ class HelpPage:
                     size="lg",
                 )
 
-        user_guide_md_dir = self.doc_dir / "usage.md"
-        if user_guide_md_dir.exists():
-            with (self.doc_dir / "usage.md").open(encoding="utf-8") as fi:
-                user_guide_md = fi.read()
-        else:  # fetch from remote
-            user_guide_md = get_remote_doc(
-                f"{self.remote_content_url}/v{self.app_version}/docs/usage.md"
-            )
-        if user_guide_md:
-            with gr.Accordion("User Guide", open=not KH_DEMO_MODE):
-                gr.Markdown(user_guide_md)
-
-        if self.app_version:
-            # try retrieve from cache
-            changelogs = ""
-
-            if (self.changelogs_cache_dir / f"{version}.md").exists():
-                with open(self.changelogs_cache_dir / f"{version}.md", "r") as fi:
-                    changelogs = fi.read()
-            else:
-                release_url_base = (
-                    "https://api.github.com/repos/Cinnamon/kotaemon/releases"
-                )
-                changelogs = download_changelogs(
-                    release_url=f"{release_url_base}/tags/v{self.app_version}"
-                )
+        with gr.Accordion(
+            "User Guide", open=not KH_DEMO_MODE, visible=False
+        ) as self.user_guide_accordion:
+            self.user_guide_md = gr.Markdown()
+
+        with gr.Accordion(
+            f"Changelogs (v{self.app_version})", visible=False
+        ) as self.changelogs_accordion:
+            self.changelogs_md = gr.Markdown()
+
+    @property
+    def outputs(self) -> list:
+        """The components updated by `load`"""
+        return [
+            self.about_accordion,
+            self.about_md,
+            self.user_guide_accordion,
+            self.user_guide_md,
+            self.changelogs_accordion,
+            self.changelogs_md,
+        ]
+
+    def load(self) -> list:
+        """Read the help documents, once, and show them"""
+        if self._docs is None:
+            about_md = self._read_doc("about.md")
+            if about_md and self.app_version:
+                about_md = f"Version: {self.app_version}\n\n{about_md}"
+            self._docs = (about_md, self._read_doc("usage.md"), self._read_changelogs())
+
+        updates = []
+        for content in self._docs:
+            updates.extend([gr.update(visible=bool(content)), gr.update(value=content)])
+        return updates
+
+    def _read_doc(self, name: str) -> str:
+        doc_path = self.doc_dir / name
+        if doc_path.exists():
+            with doc_path.open(encoding="utf-8") as fi:
+                return fi.read()
+
+        # fetch from remote
+        return get_remote_doc(
+            f"{self.remote_content_url}/v{self.app_version}/docs/{name}"
+        )
+
+    def _read_changelogs(self) -> str:
+        if not self.app_version:
+            return ""
+
+        # try retrieve from cache
+        cache_file = self.changelogs_cache_dir / f"{self.app_version}.md"
+        if cache_file.exists():
+            with open(cache_file, "r") as fi:
+                return fi.read()
+
+        release_url_base = "https://api.github.com/repos/Cinnamon/kotaemon/releases"
+        changelogs = download_changelogs(
+            release_url=f"{release_url_base}/tags/v{self.app_version}"
+        )
+
+        # cache the changelogs
+        if not self.changelogs_cache_dir.exists():
+            self.changelogs_cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "w") as fi:
+            fi.write(changelogs)
 
-                # cache the changelogs
-                if not self.changelogs_cache_dir.exists():
-                    self.changelogs_cache_dir.mkdir(parents=True, exist_ok=True)
-                with open(
-                    self.changelogs_cache_dir / f"{self.app_version}.md", "w"
-                ) as fi:
-                    fi.write(changelogs)
-
-            if changelogs:
-                with gr.Accordion(f"Changelogs (v{self.app_version})"):
-                    gr.Markdown(changelogs)
+        return changelogs
@@ -67,7 +67,7 @@ class ResourcesTab(BasePage):
             # Use tenant system
             from ktem.services.tenant_auth import TenantAuthService
             
-            auth_user = TenantAuthService.get_user_by_id(user_id)
+            auth_user = TenantAuthService.get_cached_user(user_id)
             if auth_user and auth_user.is_admin:
                 return gr.update(visible=True)
         else:
@@ -375,7 +375,7 @@ class UserManagement(BasePage):
             from ktem.db.models import TenantUser, Tenant
             
             # Get current user from tenant system
-            current_user = TenantAuthService.get_user_by_id(user_id)
+            current_user = TenantAuthService.get_cached_user(user_id)
             if not current_user or not current_user.is_admin:
                 return [], pd.DataFrame.from_records(
                     [{"id": "-", "username": "-", "role": "-", "email": "-"}]
@@ -72,7 +72,7 @@ class SettingsPage(BasePage):
         self._settings_state = app.settings_state
         self._user_id = app.user_id
         self._default_settings = app.default_settings
-        self._settings_dict = self._default_settings.flatten()
+        self._settings_dict = app.flat_default_settings
         self._settings_keys = list(self._settings_dict.keys())
 
         self._components = {}
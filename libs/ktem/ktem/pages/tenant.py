@@ -1,4 +1,7 @@
+import asyncio
 import gradio as gr
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from typing import Optional, List, Dict, Any
 import json
 
@@ -6,13 +9,97 @@ from ktem.app import BasePage
 from ktem.services.tenant_auth import TenantAuthService, TenantAuthMiddleware, AuthUser
 from ktem.db.models import Tenant, TenantUser, TenantInvitation, engine
 from ktem.db.tenant_models import UserRole, TenantStatus
+from sqlalchemy.orm import sessionmaker
 from sqlmodel import Session, select
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Creating a user hashes its password; run that on a small dedicated pool so a
+# burst of sign-ups can't take over the worker threads shared by all events
+_HASH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pw-hash")
+
+_ROLE_CHOICES = (("User", "user"), ("Admin", "admin"))
+_TENANT_STATUS_CHOICES = (
+    ("Active", "active"), ("Suspended", "suspended"), ("Inactive", "inactive")
+)
+_USERS_HEADERS = ("ID", "Username", "Email", "Role", "Status", "Last Login", "Actions")
+_USERS_DTYPES = ("str",) * len(_USERS_HEADERS)
+_INVITES_HEADERS = ("Email", "Role", "Status", "Sent Date", "Expires", "Actions")
+_INVITES_DTYPES = ("str",) * len(_INVITES_HEADERS)
+
+# table cell values
+_ACTIVE = "Active"  # the user status label, see `get_tenant_users_rows`
+_USED, _PENDING = "Used", "Pending"
+_EDIT_DEACT, _RESEND, _VIEW = "Edit | Deactivate", "Resend", "View"
+_NEVER = "Never"
+
+# Shared visibility-only updates. Gradio pops "value" off update dicts,
+# so only updates without a value are safe to reuse across events
+_SHOW = gr.update(visible=True)
+_HIDE = gr.update(visible=False)
+
+# The page only reads back plain attributes after a commit, so don't expire them
+_SessionLocal = sessionmaker(engine, class_=Session, expire_on_commit=False)
+
+# number of rows shown per page of the users and invitations tables
+_PAGE_SIZE = 100
+
+
+def _fmt_dt(dt) -> str:
+    """`dt` as YYYY-MM-DD HH:MM, or "Never" if unset"""
+    # sliced, to drop the UTC offset isoformat adds for aware datetimes
+    return dt.isoformat(" ", "minutes")[:16] if dt else _NEVER
+
+
+def _fmt_date(dt) -> str:
+    """`dt` as YYYY-MM-DD"""
+    return dt.isoformat()[:10]
+
+
+@lru_cache(maxsize=2048)
+def render_tenant_markdown(tenant_name: str, role_title: str, username: str, email: str):
+    """Render the tenant info shown on the tenant and chat pages
+    
+    Cached on the user fields it shows, so an edited user or tenant renders
+    under a new key.
+    
+    Returns:
+        (tenant_info, readonly_info, context_info) markdown strings
+    """
+    tenant_info = f"""
+**Tenant:** {tenant_name}  
+**Your Role:** {role_title}  
+**Status:** Active
+"""
+    
+    readonly_info = f"""
+### Your Tenant Information
+- **Name:** {tenant_name}
+- **Your Role:** {role_title}
+- **Your Username:** {username}
+- **Your Email:** {email}
+
+*Contact your tenant administrator to modify tenant settings or manage users.*
+"""
+    
+    context_info = f"""
+**🏢 Tenant:** {tenant_name} | **👤 Role:** {role_title} | **📧 {email}**
+"""
+    
+    return tenant_info, readonly_info, context_info
+
+
+def _page_offset(page) -> int:
+    """Row offset of a 1-based page number coming from a `gr.Number`"""
+    return (max(int(page or 1), 1) - 1) * _PAGE_SIZE
+
 
 class TenantPage(BasePage):
     def __init__(self, app):
         self._app = app
-        self.current_user: Optional[AuthUser] = None
         self.render()
 
     def render(self):
@@ -57,7 +144,7 @@ class TenantPage(BasePage):
                 with gr.Row():
                     self.new_password = gr.Textbox(label="Password", type="password")
                     self.new_role = gr.Dropdown(
-                        choices=[("User", "user"), ("Admin", "admin")],
+                        choices=_ROLE_CHOICES,
                         label="Role",
                         value="user"
                     )
@@ -65,14 +152,15 @@ class TenantPage(BasePage):
             
             # Users table
             self.users_table = gr.DataFrame(
-                headers=["ID", "Username", "Email", "Role", "Status", "Last Login", "Actions"],
-                datatype=["str", "str", "str", "str", "str", "str", "str"],
+                headers=list(_USERS_HEADERS),
+                datatype=list(_USERS_DTYPES),
                 interactive=False,
                 wrap=True
             )
             
             # User management buttons
             with gr.Row():
+                self.users_page = gr.Number(label="Page", value=1, minimum=1, precision=0)
                 self.refresh_users_btn = gr.Button("Refresh", variant="secondary")
                 self.deactivate_user_btn = gr.Button("Deactivate Selected", variant="stop", visible=False)
                 
@@ -83,7 +171,7 @@ class TenantPage(BasePage):
                 self.edit_username = gr.Textbox(label="Username")
                 self.edit_email = gr.Textbox(label="Email")
                 self.edit_role = gr.Dropdown(
-                    choices=[("User", "user"), ("Admin", "admin")],
+                    choices=_ROLE_CHOICES,
                     label="Role"
                 )
                 with gr.Row():
@@ -101,7 +189,7 @@ class TenantPage(BasePage):
                 with gr.Row():
                     self.invite_email = gr.Textbox(label="Email", placeholder="user@example.com")
                     self.invite_role = gr.Dropdown(
-                        choices=[("User", "user"), ("Admin", "admin")],
+                        choices=_ROLE_CHOICES,
                         label="Role",
                         value="user"
                     )
@@ -109,13 +197,16 @@ class TenantPage(BasePage):
             
             # Invitations table
             self.invitations_table = gr.DataFrame(
-                headers=["Email", "Role", "Status", "Sent Date", "Expires", "Actions"],
-                datatype=["str", "str", "str", "str", "str", "str"],
+                headers=list(_INVITES_HEADERS),
+                datatype=list(_INVITES_DTYPES),
                 interactive=False,
                 wrap=True
             )
             
-            self.refresh_invitations_btn = gr.Button("Refresh", variant="secondary")
+            with gr.Row():
+                self.invitations_page = gr.Number(label="Page", value=1, minimum=1, precision=0)
+                self.show_used_invitations = gr.Checkbox(label="Show used", value=True)
+                self.refresh_invitations_btn = gr.Button("Refresh", variant="secondary")
 
     def _render_tenant_settings(self):
         """Render tenant settings interface"""
@@ -128,7 +219,7 @@ class TenantPage(BasePage):
                 self.tenant_name = gr.Textbox(label="Tenant Name")
                 self.tenant_domain = gr.Textbox(label="Domain", placeholder="Optional custom domain")
                 self.tenant_status = gr.Dropdown(
-                    choices=[("Active", "active"), ("Suspended", "suspended"), ("Inactive", "inactive")],
+                    choices=_TENANT_STATUS_CHOICES,
                     label="Status"
                 )
                 
@@ -147,9 +238,9 @@ class TenantPage(BasePage):
 
     def on_register_events(self):
         """Register event handlers"""
-        # Load user context and update UI
+        # Load user context, update UI and fill both tables in one go
         self._app.app.load(
-            self._load_user_context,
+            self._load_all,
             inputs=[self._app.user_id],
             outputs=[
                 self.tenant_info, 
@@ -157,165 +248,203 @@ class TenantPage(BasePage):
                 self.send_invitation_section,
                 self.tenant_settings_section,
                 self.tenant_info_readonly,
-                self.deactivate_user_btn
+                self.deactivate_user_btn,
+                self.users_table,
+                self.invitations_table
             ]
-        ).then(
-            self._load_users_data,
-            outputs=[self.users_table]
-        ).then(
-            self._load_invitations_data,
-            outputs=[self.invitations_table]
         )
         
         # User management events
         self.add_user_btn.click(
             self._add_user,
-            inputs=[self.new_username, self.new_email, self.new_password, self.new_role],
+            inputs=[self._app.user_id, self.new_username, self.new_email, self.new_password, self.new_role],
             outputs=[self.status_message, self.users_table]
         )
         
-        self.refresh_users_btn.click(
-            self._load_users_data,
+        gr.on(
+            triggers=[self.refresh_users_btn.click, self.users_page.submit],
+            fn=self._load_users_data,
+            inputs=[self._app.user_id, self.users_page],
             outputs=[self.users_table]
         )
         
         # Invitation events
         self.send_invite_btn.click(
             self._send_invitation,
-            inputs=[self.invite_email, self.invite_role],
+            inputs=[self._app.user_id, self.invite_email, self.invite_role],
             outputs=[self.status_message, self.invitations_table]
         )
         
-        self.refresh_invitations_btn.click(
-            self._load_invitations_data,
+        gr.on(
+            triggers=[
+                self.refresh_invitations_btn.click,
+                self.invitations_page.submit,
+                self.show_used_invitations.change,
+            ],
+            fn=self._load_invitations_data,
+            inputs=[self._app.user_id, self.invitations_page, self.show_used_invitations],
             outputs=[self.invitations_table]
         )
         
         # Tenant settings events
         self.save_tenant_btn.click(
             self._save_tenant_settings,
-            inputs=[self.tenant_name, self.tenant_domain, self.tenant_status, self.tenant_settings_json],
+            inputs=[self._app.user_id, self.tenant_name, self.tenant_domain, self.tenant_status, self.tenant_settings_json],
             outputs=[self.status_message]
         )
 
-    def _load_user_context(self, user_id: str):
-        """Load current user context and determine permissions"""
+    def _user_context(self, user_id: str, user: Optional[AuthUser]):
+        """UI updates for the current user's context and permissions"""
         if not user_id:
             return (
                 "**Not authenticated**", 
-                gr.update(visible=False),  # add_user_section
-                gr.update(visible=False),  # send_invitation_section  
-                gr.update(visible=False),  # tenant_settings_section
-                gr.update(visible=True),   # tenant_info_readonly
-                gr.update(visible=False)   # deactivate_user_btn
+                _HIDE,  # add_user_section
+                _HIDE,  # send_invitation_section  
+                _HIDE,  # tenant_settings_section
+                _SHOW,  # tenant_info_readonly
+                _HIDE   # deactivate_user_btn
             )
         
-        self.current_user = TenantAuthService.get_user_by_id(user_id)
-        
-        if not self.current_user:
-            return (
-                "**User not found**",
-                gr.update(visible=False),
-                gr.update(visible=False),
-                gr.update(visible=False), 
-                gr.update(visible=True),
-                gr.update(visible=False)
-            )
+        if not user:
+            return ("**User not found**", _HIDE, _HIDE, _HIDE, _SHOW, _HIDE)
         
         # Update tenant info
-        tenant_info = f"""
-**Tenant:** {self.current_user.tenant_name}  
-**Your Role:** {self.current_user.role.value.title()}  
-**Status:** Active
-"""
-        
-        readonly_info = f"""
-### Your Tenant Information
-- **Name:** {self.current_user.tenant_name}
-- **Your Role:** {self.current_user.role.value.title()}
-- **Your Username:** {self.current_user.username}
-- **Your Email:** {self.current_user.email}
-
-*Contact your tenant administrator to modify tenant settings or manage users.*
-"""
+        tenant_info, readonly_info, _ = render_tenant_markdown(
+            user.tenant_name, user.role.value.title(), user.username, user.email
+        )
         
-        is_admin = self.current_user.is_admin
+        is_admin = user.is_admin
+        admin_only = _SHOW if is_admin else _HIDE
         
         return (
             tenant_info,
-            gr.update(visible=is_admin),      # add_user_section
-            gr.update(visible=is_admin),      # send_invitation_section
-            gr.update(visible=is_admin),      # tenant_settings_section
+            admin_only,  # add_user_section
+            admin_only,  # send_invitation_section
+            admin_only,  # tenant_settings_section
             gr.update(visible=not is_admin, value=readonly_info if not is_admin else ""),  # tenant_info_readonly
-            gr.update(visible=is_admin)       # deactivate_user_btn
+            admin_only   # deactivate_user_btn
         )
 
-    def _load_users_data(self):
-        """Load users data for the table"""
-        if not self.current_user:
+    def _get_user(self, user_id: str) -> Optional[AuthUser]:
+        """The user behind this session's `user_id`, resolved per event
+        
+        Handlers of concurrent sessions share this page object, so the user is
+        passed along rather than kept on it
+        """
+        return self._app.get_auth_user(user_id) if user_id else None
+
+    async def _load_all(self, user_id: str):
+        """Load the user context, then both tables concurrently"""
+        user = await asyncio.to_thread(self._get_user, user_id)
+        context = self._user_context(user_id, user)
+        if not user:
+            return (*context, gr.update(value=[]), gr.update(value=[]))
+        
+        # Both loaders are independent blocking reads, each in its own DB
+        # session, run them side by side in worker threads
+        users_update, invitations_update = await asyncio.gather(
+            asyncio.to_thread(self._users_table, user),
+            asyncio.to_thread(self._invitations_table, user),
+        )
+        
+        return (*context, users_update, invitations_update)
+
+    def _load_users_data(self, user_id: str, page: int = 1):
+        """Load one page of users data for the table"""
+        return self._users_table(self._get_user(user_id), page)
+
+    def _users_table(self, user: Optional[AuthUser], page: int = 1):
+        """One page of the users of `user`'s tenant, as a table update"""
+        if not user:
             return gr.update(value=[])
         
         try:
-            users = TenantAuthService.get_tenant_users(self.current_user.tenant_id)
+            # The user rows carry no relationships, so this is a single SELECT,
+            # see `test_tenant_users_rows_query_count`
+            users = TenantAuthService.get_tenant_users_rows(
+                user.tenant_id,
+                offset=_page_offset(page),
+                limit=_PAGE_SIZE,
+            )
             
-            data = []
-            for user in users:
-                last_login = user.last_login.strftime("%Y-%m-%d %H:%M") if user.last_login else "Never"
-                status = "Active" if user.is_active else "Inactive"
-                actions = "Edit | Deactivate" if user.is_active and user.id != self.current_user.id else "View"
-                
-                data.append([
-                    user.id[:8] + "...",  # Shortened ID
-                    user.username,
-                    user.email,
-                    user.role.value.title(),
+            # At most _PAGE_SIZE rows, already the first paint, so send them in
+            # one update rather than streaming partial tables
+            my_id = user.id
+            return gr.update(value=[
+                [
+                    uid[:8] + "...",  # Shortened ID
+                    username,
+                    email,
+                    role,
                     status,
-                    last_login,
-                    actions
-                ])
-            
-            return gr.update(value=data)
+                    _fmt_dt(last_login),
+                    _EDIT_DEACT if status == _ACTIVE and uid != my_id else _VIEW,
+                ]
+                for uid, username, email, role, status, last_login in users
+            ])
         except Exception as e:
             print(f"Error loading users: {e}")
             return gr.update(value=[])
 
-    def _load_invitations_data(self):
-        """Load invitations data for the table"""
-        if not self.current_user or not self.current_user.is_admin:
+    def _load_invitations_data(self, user_id: str, page: int = 1, show_used: bool = True):
+        """Load one page of invitations data for the table, pending ones first"""
+        return self._invitations_table(self._get_user(user_id), page, show_used)
+
+    def _invitations_table(self, user: Optional[AuthUser], page: int = 1, show_used: bool = True):
+        """One page of the invitations of `user`'s tenant, as a table update"""
+        if not user or not user.is_admin:
             return gr.update(value=[])
         
         try:
-            with Session(engine) as session:
-                invitations = session.exec(
-                    select(TenantInvitation).where(
-                        TenantInvitation.tenant_id == self.current_user.tenant_id
-                    )
-                ).all()
-                
-                data = []
-                for invite in invitations:
-                    status = "Used" if invite.is_used else "Pending"
-                    sent_date = invite.date_created.strftime("%Y-%m-%d")
-                    expires = invite.expires_at.strftime("%Y-%m-%d")
-                    actions = "Resend" if not invite.is_used else "View"
-                    
-                    data.append([
-                        invite.email,
-                        invite.role.value.title(),
-                        status,
-                        sent_date,
-                        expires,
-                        actions
-                    ])
+            query = select(
+                TenantInvitation.email,
+                TenantInvitation.role,
+                TenantInvitation.is_used,
+                TenantInvitation.date_created,
+                TenantInvitation.expires_at,
+            ).where(
+                TenantInvitation.tenant_id == user.tenant_id
+            )
+            if not show_used:
+                query = query.where(TenantInvitation.is_used == False)
+            query = query.order_by(
+                TenantInvitation.is_used,
+                TenantInvitation.expires_at.desc(),
+                TenantInvitation.id,
+            ).offset(_page_offset(page)).limit(_PAGE_SIZE)
+            
+            with _SessionLocal() as session:
+                invitations = session.exec(query).all()
                 
-                return gr.update(value=data)
+                return gr.update(value=[
+                    [
+                        email,
+                        role.value.title(),
+                        _USED if used else _PENDING,
+                        _fmt_date(sent),
+                        _fmt_date(expires),
+                        _VIEW if used else _RESEND,
+                    ]
+                    for email, role, used, sent, expires in invitations
+                ])
         except Exception as e:
             print(f"Error loading invitations: {e}")
             return gr.update(value=[])
 
-    def _add_user(self, username: str, email: str, password: str, role: str):
+    def _require_admin(self, user_id: str) -> Optional[AuthUser]:
+        """The acting user if they are an admin of their tenant, else None"""
+        if not user_id:
+            return None
+        # read fresh rather than from the 30s user cache, which another
+        # process can't invalidate, so a demoted or deactivated admin loses
+        # access right away
+        user = TenantAuthService.get_user_by_id(user_id)
+        return user if TenantAuthMiddleware.require_admin(user) else None
+
+    async def _add_user(self, user_id: str, username: str, email: str, password: str, role: str):
         """Add a new user to the tenant"""
-        if not TenantAuthMiddleware.require_admin(self.current_user):
+        actor = await asyncio.to_thread(self._require_admin, user_id)
+        if not actor:
             return gr.update(value="❌ **Error:** You don't have permission to add users.", visible=True), gr.update()
         
         if not username or not email or not password:
@@ -323,17 +452,18 @@ class TenantPage(BasePage):
         
         try:
             user_role = UserRole.ADMIN if role == "admin" else UserRole.USER
-            TenantAuthService.create_user(
-                tenant_id=self.current_user.tenant_id,
+            await asyncio.get_running_loop().run_in_executor(_HASH_POOL, partial(
+                TenantAuthService.create_user,
+                tenant_id=actor.tenant_id,
                 username=username,
                 email=email,
                 password=password,
                 role=user_role,
-                created_by=self.current_user.id
-            )
+                created_by=actor.id
+            ))
             
-            # Reload users table
-            users_update = self._load_users_data()
+            # Reload users table, off the event loop as well
+            users_update = await asyncio.to_thread(self._users_table, actor)
             
             return (
                 gr.update(value="✅ **Success:** User added successfully!", visible=True),
@@ -345,9 +475,10 @@ class TenantPage(BasePage):
                 gr.update()
             )
 
-    def _send_invitation(self, email: str, role: str):
+    def _send_invitation(self, user_id: str, email: str, role: str):
         """Send an invitation to join the tenant"""
-        if not TenantAuthMiddleware.require_admin(self.current_user):
+        actor = self._require_admin(user_id)
+        if not actor:
             return gr.update(value="❌ **Error:** You don't have permission to send invitations.", visible=True), gr.update()
         
         if not email:
@@ -356,14 +487,14 @@ class TenantPage(BasePage):
         try:
             user_role = UserRole.ADMIN if role == "admin" else UserRole.USER
             invitation = TenantAuthService.invite_user(
-                tenant_id=self.current_user.tenant_id,
+                tenant_id=actor.tenant_id,
                 email=email,
                 role=user_role,
-                invited_by=self.current_user.id
+                invited_by=actor.id
             )
             
             # Reload invitations table
-            invitations_update = self._load_invitations_data()
+            invitations_update = self._invitations_table(actor)
             
             return (
                 gr.update(value=f"✅ **Success:** Invitation sent to {email}. Token: {invitation.token}", visible=True),
@@ -375,19 +506,20 @@ class TenantPage(BasePage):
                 gr.update()
             )
 
-    def _save_tenant_settings(self, name: str, domain: str, status: str, settings_json: str):
+    def _save_tenant_settings(self, user_id: str, name: str, domain: str, status: str, settings_json: str):
         """Save tenant settings"""
-        if not TenantAuthMiddleware.require_admin(self.current_user):
+        actor = self._require_admin(user_id)
+        if not actor:
             return gr.update(value="❌ **Error:** You don't have permission to modify tenant settings.", visible=True)
         
         try:
             # Parse settings JSON
             settings_dict = {}
             if settings_json.strip():
-                settings_dict = json.loads(settings_json)
+                settings_dict = json_loads(settings_json)
             
-            with Session(engine) as session:
-                tenant = session.get(Tenant, self.current_user.tenant_id)
+            with _SessionLocal() as session:
+                tenant = session.get(Tenant, actor.tenant_id)
                 if tenant:
                     tenant.name = name or tenant.name
                     tenant.domain = domain or None
@@ -396,12 +528,14 @@ class TenantPage(BasePage):
                     
                     session.add(tenant)
                     session.commit()
+                    # the cached users carry the tenant name
+                    TenantAuthService.invalidate_user_cache()
                     
                     return gr.update(value="✅ **Success:** Tenant settings saved successfully!", visible=True)
             
             return gr.update(value="❌ **Error:** Tenant not found.", visible=True)
             
-        except json.JSONDecodeError:
+        except json.JSONDecodeError:  # also raised by orjson
             return gr.update(value="❌ **Error:** Invalid JSON in settings.", visible=True)
         except Exception as e:
             return gr.update(value=f"❌ **Error:** Failed to save settings: {str(e)}", visible=True)
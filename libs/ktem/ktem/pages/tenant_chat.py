@@ -2,6 +2,7 @@ import gradio as gr
 from typing import Optional
 
 from ktem.pages.chat import ChatPage
+from ktem.pages.tenant import render_tenant_markdown
 from ktem.services.tenant_auth import TenantAuthService, TenantAuthMiddleware, AuthUser
 
 
@@ -64,7 +65,7 @@ class TenantChatPage(ChatPage):
                 gr.update(visible=False)
             )
         
-        self.current_user = TenantAuthService.get_user_by_id(user_id)
+        self.current_user = self._app.get_auth_user(user_id)
         
         if not self.current_user:
             return (
@@ -73,9 +74,10 @@ class TenantChatPage(ChatPage):
             )
         
         # Create tenant context display
-        context_info = f"""
-**🏢 Tenant:** {self.current_user.tenant_name} | **👤 Role:** {self.current_user.role.value.title()} | **📧 {self.current_user.email}**
-"""
+        user = self.current_user
+        _, _, context_info = render_tenant_markdown(
+            user.tenant_name, user.role.value.title(), user.username, user.email
+        )
         
         return (
             gr.update(value=context_info),
@@ -91,15 +93,27 @@ class TenantChatPage(ChatPage):
         if not self.current_user:
             return False
         
-        # Implement tenant-based conversation access control
-        # This would check if the conversation belongs to the user's tenant
-        return TenantAuthMiddleware.require_auth(self.current_user)
+        if not TenantAuthMiddleware.require_auth(self.current_user):
+            return False
+        
+        # The conversation must belong to the user's tenant
+        return bool(TenantAuthService.filter_accessible_conversations(
+            self.current_user, [conversation_id]
+        ))
     
     def _filter_conversations_by_tenant(self, conversations: list) -> list:
-        """Filter conversations based on tenant membership"""
+        """Filter conversations based on tenant membership
+        
+        Args:
+            conversations: (name, id) options, as listed by the conversation
+                control
+        """
         if not self.current_user:
             return []
         
-        # Filter conversations to only show those from the user's tenant
-        # This would be implemented based on your conversation storage structure
-        return conversations
+        # Filter conversations to only show those from the user's tenant,
+        # resolving the allowed ids in a single query
+        allowed = TenantAuthService.filter_accessible_conversations(
+            self.current_user, [conv_id for _, conv_id in conversations]
+        )
+        return [conv for conv in conversations if conv[1] in allowed]
@@ -1,14 +1,23 @@
-import hashlib
+import asyncio
+import threading
 import gradio as gr
-from typing import Optional
 
 from ktem.app import BasePage
-from ktem.db.models import User, TenantUser, Tenant, engine
-from ktem.services.tenant_auth import TenantAuthService, AuthUser
-from ktem.pages.resources.user import create_user
+from ktem.db.models import Tenant, engine
+from ktem.services.tenant_auth import TenantAuthService
 from sqlmodel import Session, select
 
 
+# Set once a tenant exists; tenants are never all removed at runtime, so the
+# setup check can stop querying from then on
+_setup_done = threading.Event()
+
+# Visibility of (login_form, registration_section, admin_setup_section) once
+# signed in; visibility-only updates, safe to share across events
+_SIGNED_IN_VISIBILITY = (
+    gr.update(visible=False), gr.update(visible=False), gr.update(visible=False)
+)
+
 # JavaScript for credential management
 fetch_creds = """
 function() {
@@ -44,37 +53,35 @@ class TenantLoginPage(BasePage):
             gr.Markdown(f"# Welcome to {self._app.app_name}!")
             gr.Markdown("### Multi-Tenant Authentication")
             
-            # Login mode selection
-            with gr.Row():
-                self.login_mode = gr.Radio(
-                    choices=[("Single Tenant", "single"), ("Multi-Tenant", "multi")],
-                    label="Login Mode",
-                    value="single",
-                    visible=True
-                )
-            
-            # Login form
-            with gr.Group():
-                self.usn = gr.Textbox(
-                    label="Username or Email",
-                    placeholder="Enter your username or email",
-                    visible=False
-                )
-                self.pwd = gr.Textbox(
-                    label="Password",
-                    type="password",
-                    placeholder="Enter your password",
-                    visible=False
-                )
-                
-                # Tenant domain (for multi-tenant mode)
-                self.tenant_domain = gr.Textbox(
-                    label="Tenant Domain",
-                    placeholder="your-company.example.com (optional)",
-                    visible=False
-                )
+            # Login mode and form, shown and hidden as a whole on sign in/out
+            with gr.Column(visible=False) as self.login_form:
+                # Login mode selection
+                with gr.Row():
+                    self.login_mode = gr.Radio(
+                        choices=[("Single Tenant", "single"), ("Multi-Tenant", "multi")],
+                        label="Login Mode",
+                        value="single",
+                    )
                 
-                self.btn_login = gr.Button("Sign In", variant="primary", visible=False)
+                # Login form
+                with gr.Group():
+                    self.usn = gr.Textbox(
+                        label="Username or Email",
+                        placeholder="Enter your username or email",
+                    )
+                    self.pwd = gr.Textbox(
+                        label="Password",
+                        type="password",
+                        placeholder="Enter your password",
+                    )
+                    
+                    # Tenant domain (for multi-tenant mode)
+                    self.tenant_domain = gr.Textbox(
+                        label="Tenant Domain",
+                        placeholder="your-company.example.com (optional)",
+                    )
+                    
+                    self.btn_login = gr.Button("Sign In", variant="primary")
             
             # Registration/Invitation section
             with gr.Group(visible=False) as self.registration_section:
@@ -157,11 +164,7 @@ class TenantLoginPage(BasePage):
         ).then(
             self._toggle_login_visibility,
             inputs=[self._app.user_id],
-            outputs=[
-                self.usn, self.pwd, self.tenant_domain, 
-                self.btn_login, self.login_mode,
-                self.registration_section, self.admin_setup_section
-            ],
+            outputs=self.visibility_outputs,
         )
         
         # Propagate to app events
@@ -176,11 +179,7 @@ class TenantLoginPage(BasePage):
         ).then(
             self._toggle_login_visibility,
             inputs=[self._app.user_id],
-            outputs=[
-                self.usn, self.pwd, self.tenant_domain,
-                self.btn_login, self.login_mode,
-                self.registration_section, self.admin_setup_section
-            ]
+            outputs=self.visibility_outputs
         )
         
         # Create first tenant
@@ -194,11 +193,7 @@ class TenantLoginPage(BasePage):
         ).then(
             self._toggle_login_visibility,
             inputs=[self._app.user_id],
-            outputs=[
-                self.usn, self.pwd, self.tenant_domain,
-                self.btn_login, self.login_mode,
-                self.registration_section, self.admin_setup_section
-            ]
+            outputs=self.visibility_outputs
         )
         
         # Toggle sections
@@ -227,11 +222,7 @@ class TenantLoginPage(BasePage):
         ).then(
             self._toggle_login_visibility,
             inputs=[self._app.user_id],
-            outputs=[
-                self.usn, self.pwd, self.tenant_domain,
-                self.btn_login, self.login_mode,
-                self.registration_section, self.admin_setup_section
-            ],
+            outputs=self.visibility_outputs,
         )
         
         # Propagate to app events
@@ -245,38 +236,41 @@ class TenantLoginPage(BasePage):
             definition={
                 "fn": self._toggle_login_visibility,
                 "inputs": [self._app.user_id],
-                "outputs": [
-                    self.usn, self.pwd, self.tenant_domain,
-                    self.btn_login, self.login_mode,
-                    self.registration_section, self.admin_setup_section
-                ],
+                "outputs": self.visibility_outputs,
                 "show_progress": "hidden",
             },
         )
 
-    def _on_login_mode_change(self, mode: str):
+    async def _on_login_mode_change(self, mode: str):
         """Handle login mode change"""
         return gr.update(visible=(mode == "multi"))
 
-    def _load_initial_state(self, usn: str, pwd: str, tenant: str):
+    async def _load_initial_state(self, usn: str, pwd: str, tenant: str, request: gr.Request = None):
         """Load initial state and try auto-login"""
+        # Nothing to sign in with, no need to touch the DB
+        if not usn or not pwd:
+            return None, usn, pwd, tenant, gr.update(visible=False)
+        
         # Check if system needs setup
-        if self._needs_setup():
+        if not _setup_done.is_set() and await asyncio.to_thread(self._needs_setup):
             return None, "", "", "", gr.update(visible=False)
         
-        # Try auto-login if credentials exist
-        if usn and pwd:
-            return self._tenant_login(usn, pwd, tenant)
-        
-        return None, usn, pwd, tenant, gr.update(visible=False)
+        # Try auto-login with the stored credentials
+        return await self._tenant_login(usn, pwd, tenant, request)
 
     def _needs_setup(self) -> bool:
         """Check if system needs initial setup"""
+        if _setup_done.is_set():
+            return False
+        
         with Session(engine) as session:
-            tenant_count = len(list(session.exec(select(Tenant)).all()))
-            return tenant_count == 0
+            has_tenant = session.exec(select(1).select_from(Tenant).limit(1)).first() is not None
+        
+        if has_tenant:
+            _setup_done.set()
+        return not has_tenant
 
-    def _tenant_login(self, username: str, password: str, tenant_domain: str, request: gr.Request = None):
+    async def _tenant_login(self, username: str, password: str, tenant_domain: str, request: gr.Request = None):
         """Enhanced login with tenant support"""
         # Try SSO first (existing gradiologin support)
         try:
@@ -287,17 +281,20 @@ class TenantLoginPage(BasePage):
 
         if user:
             # SSO flow - need to map to tenant user
-            return self._handle_sso_login(user)
+            return await asyncio.to_thread(self._handle_sso_login, user)
         
         # Regular login flow
         if not username or not password:
             return None, username, password, tenant_domain, gr.update(visible=False)
 
-        # Authenticate with tenant service
-        auth_user = TenantAuthService.authenticate_user(
+        # Authenticate with tenant service; the DB lookup and password hash
+        # run in a worker thread, the event loop stays free meanwhile
+        auth_user = await asyncio.to_thread(
+            TenantAuthService.authenticate_user,
             username=username,
             password=password,
-            tenant_domain=tenant_domain or None
+            tenant_domain=tenant_domain or None,
+            client=getattr(getattr(request, "client", None), "host", None)
         )
 
         if auth_user:
@@ -327,7 +324,7 @@ class TenantLoginPage(BasePage):
         user_id = sso_user["sub"]
         
         # Try to find existing tenant user
-        auth_user = TenantAuthService.get_user_by_id(user_id)
+        auth_user = TenantAuthService.get_cached_user(user_id)
         
         if auth_user:
             return (
@@ -349,7 +346,7 @@ class TenantLoginPage(BasePage):
             )
         )
 
-    def _accept_invitation(self, token: str, username: str, password: str):
+    async def _accept_invitation(self, token: str, username: str, password: str):
         """Accept a tenant invitation"""
         if not token or not username or not password:
             return (
@@ -358,7 +355,9 @@ class TenantLoginPage(BasePage):
             )
         
         try:
-            user = TenantAuthService.accept_invitation(token, username, password)
+            user = await asyncio.to_thread(
+                TenantAuthService.accept_invitation, token, username, password
+            )
             
             if user:
                 return (
@@ -406,6 +405,7 @@ class TenantLoginPage(BasePage):
                 admin_email=admin_email,
                 admin_password=admin_password
             )
+            _setup_done.set()
             
             return (
                 admin_user.id,
@@ -421,17 +421,24 @@ class TenantLoginPage(BasePage):
                 gr.update(value=f"❌ **Error:** Failed to create tenant: {str(e)}", visible=True)
             )
 
-    def _toggle_login_visibility(self, user_id: str):
+    @property
+    def visibility_outputs(self) -> list:
+        """The components updated by `_toggle_login_visibility`"""
+        return [self.login_form, self.registration_section, self.admin_setup_section]
+
+    async def _toggle_login_visibility(self, user_id: str):
         """Toggle visibility based on authentication state"""
-        authenticated = user_id is not None
-        needs_setup = not authenticated and self._needs_setup()
+        if user_id is not None:
+            return _SIGNED_IN_VISIBILITY
+        
+        # Only the signed-out form may need the setup check
+        needs_setup = (
+            not _setup_done.is_set()
+            and await asyncio.to_thread(self._needs_setup)
+        )
         
         return (
-            gr.update(visible=not authenticated),  # usn
-            gr.update(visible=not authenticated),  # pwd
-            gr.update(visible=not authenticated),  # tenant_domain
-            gr.update(visible=not authenticated),  # btn_login
-            gr.update(visible=not authenticated),  # login_mode
-            gr.update(visible=False),              # registration_section
+            gr.update(visible=True),   # login_form
+            gr.update(visible=False),  # registration_section
             gr.update(visible=needs_setup)  # admin_setup_section
         )
@@ -0,0 +1,216 @@
+"""
+Store of the login sessions
+
+Sessions are rows of a single SQLite table inside the sessions directory, in
+WAL mode so that a login being written doesn't hold up the readers. The
+epoch timestamps are columns of their own, indexed on expiry, so a lookup
+skips expired sessions and purging them is a range delete rather than a scan
+of every stored session.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    json_dumps = partial(json.dumps, separators=(",", ":"))
+    json_loads = json.loads
+
+DEFAULT_SESSIONS_DIR = Path(".kotaemon_sessions")
+DB_FILE_NAME = "sessions.db"
+
+# the former file-based store wrote each session to `<uuid>.json`, valid for
+# 24 hours from when the file was written
+_LEGACY_SESSION_TIMEOUT = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at);
+"""
+
+# one connection per store, shared by the worker threads one statement at a time
+_connections: Dict[Path, sqlite3.Connection] = {}
+_lock = threading.Lock()
+
+
+def db_file(sessions_dir: Path) -> Path:
+    """Get the database file path of a sessions directory"""
+    return sessions_dir / DB_FILE_NAME
+
+
+def exists(sessions_dir: Path) -> bool:
+    """Whether a store was created in the sessions directory"""
+    return db_file(sessions_dir).exists()
+
+
+def _row(session_data: Dict[str, Any]) -> Tuple:
+    """The `sessions` table row of a session record"""
+    return (
+        session_data["session_id"],
+        session_data["user_id"],
+        datetime.datetime.fromisoformat(session_data["created_at"]).timestamp(),
+        datetime.datetime.fromisoformat(session_data["expires_at"]).timestamp(),
+        json_dumps(session_data),
+    )
+
+
+def _is_legacy_session_file(name: str) -> bool:
+    """Whether a file name is one of the file-based store, `<uuid>.json`"""
+    stem, ext = os.path.splitext(name)
+    if ext != ".json":
+        return False
+    try:
+        uuid.UUID(stem)
+    except ValueError:
+        return False
+    return True
+
+
+def _import_legacy_files(conn: sqlite3.Connection, sessions_dir: Path) -> None:
+    """Move the sessions of the former file-based store into the table
+
+    Only the session files, named `<uuid>.json`, are looked at. Those written
+    longer ago than the session timeout have expired, and are removed without
+    being opened. The others are imported if still valid, then removed. Files
+    that can't be read, or not named like a session, are left in place.
+    """
+    now = time.time()
+    with os.scandir(sessions_dir) as entries:
+        for entry in entries:
+            if not (_is_legacy_session_file(entry.name) and entry.is_file()):
+                continue
+            try:
+                if entry.stat().st_mtime > now - _LEGACY_SESSION_TIMEOUT:
+                    with open(entry.path, "rb") as f:
+                        row = _row(json_loads(f.read()))
+                    if row[3] > now:
+                        # another worker may have imported it already
+                        conn.execute(
+                            "INSERT OR IGNORE INTO sessions "
+                            "(id, user_id, created_at, expires_at, data) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            row,
+                        )
+                os.unlink(entry.path)
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+
+
+def _execute(sessions_dir: Path, sql: str, params: Tuple = ()) -> Tuple[list, int]:
+    """Run a statement on the store, creating it on first use
+
+    Returns:
+        the fetched rows and the number of rows changed
+    """
+    path = db_file(sessions_dir)
+    with _lock:
+        conn = _connections.get(path)
+        if conn is None:
+            # the directory is only made here, once per process, never on the
+            # per-session paths
+            sessions_dir.mkdir(exist_ok=True)
+            # autocommit, each statement is its own transaction
+            conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # in WAL mode, fsync only at checkpoints rather than on every
+            # commit, so that concurrent logins don't queue behind each other's
+            # disk flush; a crash may only lose the latest sessions
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            _import_legacy_files(conn, sessions_dir)
+            _connections[path] = conn
+
+        # fetch while holding the lock, the cursor shares the connection
+        cursor = conn.execute(sql, params)
+        return cursor.fetchall(), cursor.rowcount
+
+
+def put(sessions_dir: Path, session_data: Dict[str, Any]) -> None:
+    """Store a newly created session"""
+    _execute(
+        sessions_dir,
+        "INSERT OR REPLACE INTO sessions (id, user_id, created_at, expires_at, data) "
+        "VALUES (?, ?, ?, ?, ?)",
+        _row(session_data),
+    )
+
+
+def get(
+    sessions_dir: Path, session_id: str, now: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """Get a session record, if it exists and hasn't expired"""
+    if now is None:
+        now = time.time()
+
+    rows, _ = _execute(
+        sessions_dir,
+        "SELECT data FROM sessions WHERE id = ? AND expires_at > ?",
+        (session_id, now),
+    )
+    return json_loads(rows[0][0]) if rows else None
+
+
+def delete(sessions_dir: Path, session_id: str) -> bool:
+    """Delete a session
+
+    Returns:
+        whether the session existed
+    """
+    _, deleted = _execute(
+        sessions_dir, "DELETE FROM sessions WHERE id = ?", (session_id,)
+    )
+    return deleted > 0
+
+
+def purge_expired(sessions_dir: Path, now: Optional[float] = None) -> int:
+    """Delete the expired sessions
+
+    Returns:
+        the number of sessions deleted
+    """
+    if now is None:
+        now = time.time()
+
+    _, deleted = _execute(
+        sessions_dir, "DELETE FROM sessions WHERE expires_at <= ?", (now,)
+    )
+    return deleted
+
+
+def latest_valid_session(
+    sessions_dir: Path, now: Optional[float] = None
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Get the most recently created, non-expired session
+
+    Returns:
+        (session_id, session record) if a valid session exists, None otherwise
+    """
+    if now is None:
+        now = time.time()
+
+    rows, _ = _execute(
+        sessions_dir,
+        "SELECT id, data FROM sessions WHERE expires_at > ? "
+        "ORDER BY created_at DESC LIMIT 1",
+        (now,),
+    )
+    if not rows:
+        return None
+
+    session_id, data = rows[0]
+    return session_id, json_loads(data)
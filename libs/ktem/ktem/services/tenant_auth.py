@@ -1,21 +1,162 @@
 import hashlib
+import hmac
 import datetime
-import json
-import uuid
+import logging
+import secrets
 import os
-from typing import Optional, Tuple, Dict, Any
-from dataclasses import dataclass
-from pathlib import Path
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Optional, Tuple, Dict, Any, Iterator, List
+from dataclasses import dataclass, field, replace
 
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import LRUCache, TTLCache
+from sqlalchemy import bindparam, case, exists, union_all, update
+from sqlalchemy.orm import defer
 from sqlmodel import Session, select
-from ktem.db.models import Tenant, TenantUser, TenantInvitation, engine
+from ktem.db.models import Tenant, TenantConversation, TenantUser, TenantInvitation, engine
 from ktem.db.tenant_models import UserRole, TenantStatus
+from ktem.services import session_store
 from tzlocal import get_localzone
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# resolved once, like the models' timestamps, instead of on every write
+_LOCAL_TZ = get_localzone()
+
+# Argon2id, with the OWASP recommended cost for a single-threaded hash
+_hasher = PasswordHasher(time_cost=3, memory_cost=46 * 1024, parallelism=1)
+
+# Successful verifications are remembered for a few minutes, so that repeated
+# sign-ins with the same credentials pay for a single Argon2id hash. Keyed by
+# an HMAC of the password and its hash under a per-process secret, so the
+# plaintext is never kept and a changed hash no longer matches
+_VERIFY_CACHE_TTL = 300
+_verify_cache: TTLCache = TTLCache(maxsize=1024, ttl=_VERIFY_CACHE_TTL)
+_verify_cache_lock = threading.Lock()
+_verify_cache_secret = os.urandom(32)
+
+# Failed login policy. After this many failed attempts in a row at the same
+# login (username or email, and tenant domain) from the same client address,
+# further attempts from that address are refused without a query or a hash,
+# until no attempt has failed for the window; a successful login clears the
+# count. Salted hashes can't be compared in SQL, so this is what keeps a
+# guessing run off the database.
+# - The client address is part of the key, so others failing at a username
+#   can't lock its owner out. Attempts without a known address aren't
+#   counted, rather than sharing one bucket anyone could fill.
+# - The counts are kept per process. This throttles a single client hammering
+#   one worker; it is no substitute for rate limiting at the reverse proxy,
+#   which guessing spread over many addresses or workers gets past.
+_MAX_FAILED_LOGINS = 10
+_FAILED_LOGIN_WINDOW = 15 * 60
+_failed_logins: TTLCache = TTLCache(maxsize=100_000, ttl=_FAILED_LOGIN_WINDOW)
+_failed_logins_lock = threading.Lock()
+
+# `get_user_by_id` results are cached for up to this many seconds, kept short
+# so that a deactivation made by another worker still applies quickly
+_USER_CACHE_TTL = 30
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=_USER_CACHE_TTL)
+_user_cache_lock = threading.RLock()
+# A user never moves to another tenant, so the tenant of each user is kept
+# with no expiry, for the authorization checks by user ID
+_user_tenant_cache: LRUCache = LRUCache(maxsize=10_000)
+
+# The sign-in lookups are built once with bound parameters, rather than as a
+# new statement on every call. Active users of active tenants only
+_active_user_of_tenant = (
+    select(TenantUser, Tenant)
+    .join(Tenant, TenantUser.tenant_id == Tenant.id)
+    .where(TenantUser.is_active == True, Tenant.status == TenantStatus.ACTIVE)
+)
+# Match the login on username or email, as a union so that each branch can
+# seek its own index where an OR across the two columns may not. Both are
+# single B-tree seeks, see `BaseTenantUser`, so a denormalized login-key
+# table would only add writes to keep in sync
+_AUTH_STMT = _active_user_of_tenant.where(TenantUser.id.in_(union_all(
+    select(TenantUser.id).where(TenantUser.username_lower == bindparam("login")),
+    select(TenantUser.id).where(TenantUser.email == bindparam("login")),
+)))
+_AUTH_DOMAIN_STMT = _AUTH_STMT.where(Tenant.domain == bindparam("tenant_domain"))
+_USER_BY_ID_STMT = _active_user_of_tenant.where(TenantUser.id == bindparam("user_id"))
+
+# Login times are written behind the login, in batches at most this often
+_LAST_LOGIN_FLUSH_INTERVAL = 0.25
+_last_login_queue: queue.SimpleQueue = queue.SimpleQueue()
+_last_login_writer: Optional[threading.Thread] = None
+_last_login_writer_lock = threading.Lock()
+# and only once a minute per user, repeated logins within it aren't recorded
+_LAST_LOGIN_RESOLUTION = datetime.timedelta(minutes=1)
+
+
+def _write_last_logins():
+    """Write the queued login times, one UPDATE batch per interval"""
+    while True:
+        # wait for a first login, then let more pile up before writing
+        pending = [_last_login_queue.get()]
+        time.sleep(_LAST_LOGIN_FLUSH_INTERVAL)
+        while True:
+            try:
+                pending.append(_last_login_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        # last write wins for a user signing in several times
+        latest = dict(pending)
+        try:
+            with Session(engine) as session:
+                session.execute(
+                    update(TenantUser),
+                    [{"id": user_id, "last_login": ts} for user_id, ts in latest.items()],
+                )
+                session.commit()
+        except Exception:
+            logger.exception(f"Failed to save the last login of {len(latest)} users")
+
+
+def _queue_last_login(user_id: str):
+    """Record a login time, to be written by the background writer"""
+    global _last_login_writer
+    if _last_login_writer is None:
+        with _last_login_writer_lock:
+            if _last_login_writer is None:
+                _last_login_writer = threading.Thread(
+                    target=_write_last_logins, name="last-login-writer", daemon=True
+                )
+                _last_login_writer.start()
+    _last_login_queue.put((user_id, datetime.datetime.now(_LOCAL_TZ)))
+
+
+def _is_last_login_stale(last_login: Optional[datetime.datetime]) -> bool:
+    """Whether a login now should be recorded over `last_login`"""
+    if last_login is None:
+        return True
+    if last_login.tzinfo is None:
+        # stored as local wall time where the column keeps no timezone
+        last_login = last_login.replace(tzinfo=_LOCAL_TZ)
+    return datetime.datetime.now(_LOCAL_TZ) - last_login >= _LAST_LOGIN_RESOLUTION
+
+
+# display labels of the listed users, computed by the database
+# (compared one by one, so that each role is bound through the column's enum type)
+_ROLE_TITLE = case(*[(TenantUser.role == role, role.value.title()) for role in UserRole])
+_STATUS_LABEL = case((TenantUser.is_active == True, "Active"), else_="Inactive")
+
+
+_ADMIN_ROLES = frozenset({UserRole.ADMIN, UserRole.SUPER_ADMIN})
+
+
+@dataclass(frozen=True, slots=True)
 class AuthUser:
-    """Authenticated user context"""
+    """Authenticated user context
+    
+    Immutable, instances are shared through the user cache. `is_admin` is
+    derived from the role once, on creation.
+    """
     id: str
     username: str
     email: str
@@ -24,11 +165,10 @@ class AuthUser:
     role: UserRole
     is_active: bool
     session_id: Optional[str] = None
+    is_admin: bool = field(init=False, repr=False, compare=False)
     
-    @property
-    def is_admin(self) -> bool:
-        """Check if user has admin privileges"""
-        return self.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]
+    def __post_init__(self):
+        object.__setattr__(self, "is_admin", self.role in _ADMIN_ROLES)
     
     @property
     def is_super_admin(self) -> bool:
@@ -50,55 +190,88 @@ class TenantAuthService:
     """Tenant authentication and authorization service"""
     
     # Session management
-    _sessions_dir = Path(".kotaemon_sessions")
+    _sessions_dir = session_store.DEFAULT_SESSIONS_DIR
     _session_timeout_hours = 24
+    # Expired sessions are never returned, so purging them is only
+    # housekeeping, done at most this often rather than on every login
+    _session_cleanup_interval = 300
+    _last_session_cleanup = float("-inf")
     
     @classmethod
-    def _ensure_sessions_dir(cls):
-        """Ensure sessions directory exists"""
-        cls._sessions_dir.mkdir(exist_ok=True)
-    
-    @classmethod
-    def _get_session_file(cls, session_id: str) -> Path:
-        """Get session file path"""
-        return cls._sessions_dir / f"{session_id}.json"
+    def _cleanup_expired_sessions(cls):
+        """Clean up expired sessions"""
+        session_store.purge_expired(cls._sessions_dir)
     
     @classmethod
-    def _cleanup_expired_sessions(cls):
-        """Clean up expired session files"""
-        if not cls._sessions_dir.exists():
+    def _maybe_cleanup_expired_sessions(cls):
+        """Clean up expired sessions, unless already done recently"""
+        now = time.monotonic()
+        if now - cls._last_session_cleanup < cls._session_cleanup_interval:
             return
         
-        current_time = datetime.datetime.now()
-        
-        for session_file in cls._sessions_dir.glob("*.json"):
-            try:
-                with open(session_file, 'r') as f:
-                    session_data = json.load(f)
-                
-                expires_at = datetime.datetime.fromisoformat(session_data['expires_at'])
-                if current_time > expires_at:
-                    session_file.unlink()
-                    
-            except (json.JSONDecodeError, KeyError, ValueError, OSError):
-                # Invalid file, delete it
-                try:
-                    session_file.unlink()
-                except OSError:
-                    pass
+        cls._last_session_cleanup = now
+        cls._cleanup_expired_sessions()
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash password using SHA256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password using Argon2id"""
+        return _hasher.hash(password)
+    
+    @staticmethod
+    def hash_passwords_bulk(passwords: List[str]) -> List[str]:
+        """Hash several passwords at once, e.g. when provisioning users
+        
+        argon2-cffi releases the GIL while hashing, so the hashes run in
+        parallel across threads.
+        
+        Returns:
+            the hashes, in the order of `passwords`
+        """
+        if len(passwords) < 2:
+            return [_hasher.hash(password) for password in passwords]
+        
+        with ThreadPoolExecutor(max_workers=min(len(passwords), os.cpu_count() or 1)) as pool:
+            return list(pool.map(_hasher.hash, passwords))
+    
+    @staticmethod
+    def _is_legacy_hash(hashed: str) -> bool:
+        """Whether `hashed` is a bare SHA256 hex digest, from before Argon2id"""
+        return not hashed.startswith("$argon2")
     
     @staticmethod
     def verify_password(password: str, hashed: str) -> bool:
-        """Verify password against hash"""
-        return TenantAuthService.hash_password(password) == hashed
+        """Verify password against hash, Argon2id or legacy SHA256"""
+        if TenantAuthService._is_legacy_hash(hashed):
+            # as bytes, compare_digest rejects str with non-ASCII characters
+            return hmac.compare_digest(
+                hashlib.sha256(password.encode()).hexdigest().encode(), hashed.encode()
+            )
+        
+        key = hmac.new(
+            _verify_cache_secret, f"{password}\0{hashed}".encode(), hashlib.sha256
+        ).digest()
+        with _verify_cache_lock:
+            if key in _verify_cache:
+                return True
+        
+        # compares in constant time itself
+        try:
+            _hasher.verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        
+        with _verify_cache_lock:
+            _verify_cache[key] = True
+        return True
+    
+    @staticmethod
+    def needs_rehash(hashed: str) -> bool:
+        """Whether `hashed` should be replaced by a hash with the current parameters"""
+        return TenantAuthService._is_legacy_hash(hashed) or _hasher.check_needs_rehash(hashed)
     
     @classmethod
-    def authenticate_user(cls, username: str, password: str, tenant_domain: Optional[str] = None) -> Optional[AuthUser]:
+    def authenticate_user(cls, username: str, password: str, tenant_domain: Optional[str] = None,
+                          client: Optional[str] = None) -> Optional[AuthUser]:
         """
         Authenticate user with tenant support
         
@@ -106,45 +279,52 @@ class TenantAuthService:
             username: Username or email
             password: Plain text password
             tenant_domain: Optional tenant domain for domain-based routing
+            client: Address of the client signing in, failed attempts are
+                only limited when it is given, see `_MAX_FAILED_LOGINS`
             
         Returns:
             AuthUser object if authentication successful, None otherwise
         """
+        login = username.lower().strip()
+        attempt = (login, tenant_domain or "", client) if client else None
+        if attempt is not None:
+            with _failed_logins_lock:
+                if _failed_logins.get(attempt, 0) >= _MAX_FAILED_LOGINS:
+                    return None
+        
         with Session(engine) as session:
-            # Build query for user lookup
-            query = select(TenantUser, Tenant).join(Tenant, TenantUser.tenant_id == Tenant.id)
-            
-            # Add username/email filter
-            query = query.where(
-                (TenantUser.username_lower == username.lower().strip()) |
-                (TenantUser.email == username.lower().strip())
-            )
-            
-            # Add tenant domain filter if provided
+            # Look the user up, by username or email, within the tenant
+            # domain if provided
+            params = {"login": login}
             if tenant_domain:
-                query = query.where(Tenant.domain == tenant_domain)
-            
-            # Only active users and tenants
-            query = query.where(
-                TenantUser.is_active == True,
-                Tenant.status == TenantStatus.ACTIVE
-            )
+                query = _AUTH_DOMAIN_STMT
+                params["tenant_domain"] = tenant_domain
+            else:
+                query = _AUTH_STMT
             
-            result = session.exec(query).first()
+            result = session.exec(query, params=params).first()
             
-            if not result:
+            # Verify password
+            if not result or not cls.verify_password(password, result[0].password):
+                if attempt is not None:
+                    with _failed_logins_lock:
+                        _failed_logins[attempt] = _failed_logins.get(attempt, 0) + 1
                 return None
-                
+            
             user, tenant = result
+            if attempt is not None:
+                with _failed_logins_lock:
+                    _failed_logins.pop(attempt, None)
             
-            # Verify password
-            if not cls.verify_password(password, user.password):
-                return None
+            # Upgrade legacy or outdated hashes
+            if cls.needs_rehash(user.password):
+                user.password = cls.hash_password(password)
+                session.add(user)
+                session.commit()
             
-            # Update last login
-            user.last_login = datetime.datetime.now(get_localzone())
-            session.add(user)
-            session.commit()
+            # Update last login, off the login path
+            if _is_last_login_stale(user.last_login):
+                _queue_last_login(user.id)
             
             auth_user = AuthUser(
                 id=user.id,
@@ -160,22 +340,13 @@ class TenantAuthService:
             session_id = cls.create_session(auth_user)
             
             # Store session ID in auth_user for retrieval
-            auth_user.session_id = session_id
-            
-            return auth_user
+            return replace(auth_user, session_id=session_id)
     
     @staticmethod
     def get_user_by_id(user_id: str) -> Optional[AuthUser]:
         """Get authenticated user by ID"""
         with Session(engine) as session:
-            query = select(TenantUser, Tenant).join(Tenant, TenantUser.tenant_id == Tenant.id)
-            query = query.where(
-                TenantUser.id == user_id,
-                TenantUser.is_active == True,
-                Tenant.status == TenantStatus.ACTIVE
-            )
-            
-            result = session.exec(query).first()
+            result = session.exec(_USER_BY_ID_STMT, params={"user_id": user_id}).first()
             if not result:
                 return None
                 
@@ -191,9 +362,60 @@ class TenantAuthService:
                 is_active=user.is_active
             )
     
+    @staticmethod
+    def get_cached_user(user_id: str) -> Optional[AuthUser]:
+        """Get authenticated user by ID, from a short-lived in-process cache"""
+        with _user_cache_lock:
+            auth_user = _user_cache.get(user_id)
+        if auth_user is not None:
+            return auth_user
+        
+        # Query outside the lock; unknown users are not cached, so that a new
+        # account can sign in right away
+        auth_user = TenantAuthService.get_user_by_id(user_id)
+        if auth_user is not None:
+            with _user_cache_lock:
+                _user_cache[user_id] = auth_user
+        return auth_user
+    
+    @staticmethod
+    def get_user_tenant_id(user_id: str) -> Optional[str]:
+        """Get the tenant ID of a user, from the caches when it is there"""
+        with _user_cache_lock:
+            auth_user = _user_cache.get(user_id)
+            tenant_id = _user_tenant_cache.get(user_id)
+        if auth_user is not None:
+            return auth_user.tenant_id
+        if tenant_id is not None:
+            return tenant_id
+        
+        with Session(engine) as session:
+            tenant_id = session.exec(
+                select(TenantUser.tenant_id).where(TenantUser.id == user_id)
+            ).first()
+        # unknown users are not cached, as in `get_cached_user`
+        if tenant_id is not None:
+            with _user_cache_lock:
+                _user_tenant_cache[user_id] = tenant_id
+        return tenant_id
+    
+    @staticmethod
+    def invalidate_user_cache(user_id: Optional[str] = None):
+        """Drop a cached user, or all of them if no `user_id` is given
+        
+        Call after users or tenants were modified; tenant changes affect all
+        the users of the tenant, so they drop everything.
+        """
+        with _user_cache_lock:
+            if user_id is None:
+                _user_cache.clear()
+            else:
+                _user_cache.pop(user_id, None)
+    
     @staticmethod
     def create_tenant(name: str, domain: Optional[str] = None, admin_username: str = None, 
-                     admin_email: str = None, admin_password: str = None) -> Tuple[Tenant, TenantUser]:
+                     admin_email: str = None, admin_password: str = None,
+                     session: Optional[Session] = None) -> Tuple[Tenant, TenantUser]:
         """
         Create a new tenant with admin user
         
@@ -203,19 +425,21 @@ class TenantAuthService:
             admin_username: Admin username
             admin_email: Admin email
             admin_password: Admin password (plain text)
+            session: Optional session to add the rows to, the caller then
+                commits them, e.g. along with more users of the tenant
             
         Returns:
             Tuple of (Tenant, TenantUser)
         """
-        with Session(engine) as session:
-            # Create tenant
+        own_session = session is None
+        # the returned rows stay readable once the session is closed
+        with nullcontext(session) if session else Session(engine, expire_on_commit=False) as session:
+            # Create tenant, its ID is generated client-side
             tenant = Tenant(
                 name=name,
                 domain=domain,
                 status=TenantStatus.ACTIVE
             )
-            session.add(tenant)
-            session.flush()  # Get tenant ID
             
             # Create admin user
             admin_user = TenantUser(
@@ -228,8 +452,9 @@ class TenantAuthService:
                 is_active=True,
                 admin=True  # For legacy compatibility
             )
-            session.add(admin_user)
-            session.commit()
+            session.add_all([tenant, admin_user])
+            if own_session:
+                session.commit()
             
             return tenant, admin_user
     
@@ -266,6 +491,47 @@ class TenantAuthService:
             
             return user
     
+    @staticmethod
+    def create_users_bulk(tenant_id: str,
+                          users: List[Tuple[str, str, str, UserRole]]) -> List[TenantUser]:
+        """
+        Create several users in a tenant, in a single transaction
+        
+        The passwords are hashed in parallel, and the users inserted as one
+        batch: their IDs are generated client-side, so the INSERTs are sent
+        as multi-row statements.
+        
+        Args:
+            tenant_id: Tenant ID
+            users: (username, email, plain text password, role) of each user
+            
+        Returns:
+            Created TenantUsers, in the order of `users`
+        """
+        password_hashes = TenantAuthService.hash_passwords_bulk(
+            [password for _, _, password, _ in users]
+        )
+        created = [
+            TenantUser(
+                username=username,
+                username_lower=username.lower(),
+                email=email,
+                password=password_hash,
+                tenant_id=tenant_id,
+                role=role,
+                is_active=True,
+                admin=(role == UserRole.ADMIN)  # For legacy compatibility
+            )
+            for (username, email, _, role), password_hash in zip(users, password_hashes)
+        ]
+        
+        # the returned rows stay readable once the session is closed
+        with Session(engine, expire_on_commit=False) as session:
+            session.add_all(created)
+            session.commit()
+        
+        return created
+    
     @staticmethod
     def invite_user(tenant_id: str, email: str, role: UserRole, invited_by: str) -> TenantInvitation:
         """
@@ -305,103 +571,206 @@ class TenantAuthService:
         Returns:
             Created TenantUser if successful, None otherwise
         """
-        with Session(engine) as session:
-            # Find valid invitation
-            invitation = session.exec(
-                select(TenantInvitation).where(
-                    TenantInvitation.token == token,
-                    TenantInvitation.is_used == False,
-                    TenantInvitation.expires_at > datetime.datetime.now(get_localzone())
-                )
-            ).first()
+        # Hashed up front, so that no row stays locked while it runs
+        password_hash = TenantAuthService.hash_password(password)
+        now = datetime.datetime.now(_LOCAL_TZ)
+        
+        # Claim the invitation if it is valid and the user doesn't already
+        # exist in the tenant, in one conditional UPDATE. A concurrent accept
+        # of the same token finds it used and claims nothing
+        user_exists = exists().where(
+            TenantUser.tenant_id == TenantInvitation.tenant_id,
+            (TenantUser.username_lower == username.lower()) | 
+            (TenantUser.email == TenantInvitation.email)
+        )
+        claim = update(TenantInvitation).where(
+            TenantInvitation.token == token,
+            TenantInvitation.is_used == False,
+            TenantInvitation.expires_at > now,
+            ~user_exists
+        ).values(is_used=True, accepted_at=now).execution_options(synchronize_session=False)
+        claimed = (TenantInvitation.tenant_id, TenantInvitation.email, TenantInvitation.role)
+        
+        # the returned row stays readable once the session is closed
+        with Session(engine, expire_on_commit=False) as session:
+            if engine.dialect.update_returning:
+                invitation = session.execute(claim.returning(*claimed)).first()
+            elif session.execute(claim).rowcount:
+                # e.g. MySQL, read the claimed invitation back
+                invitation = session.execute(
+                    select(*claimed).where(TenantInvitation.token == token)
+                ).first()
+            else:
+                invitation = None
             
             if not invitation:
                 return None
             
-            # Check if user already exists in tenant
-            existing_user = session.exec(
-                select(TenantUser).where(
-                    TenantUser.tenant_id == invitation.tenant_id,
-                    (TenantUser.username_lower == username.lower()) | 
-                    (TenantUser.email == invitation.email)
-                )
-            ).first()
-            
-            if existing_user:
-                return None
-            
             # Create user
             user = TenantUser(
                 username=username,
                 username_lower=username.lower(),
                 email=invitation.email,
-                password=TenantAuthService.hash_password(password),
+                password=password_hash,
                 tenant_id=invitation.tenant_id,
                 role=invitation.role,
                 is_active=True,
                 admin=(invitation.role == UserRole.ADMIN)  # For legacy compatibility
             )
-            session.add(user)
-            
-            # Mark invitation as used
-            invitation.is_used = True
-            invitation.accepted_at = datetime.datetime.now(get_localzone())
-            session.add(invitation)
             
+            session.add(user)
             session.commit()
             return user
     
     @staticmethod
-    def get_tenant_users(tenant_id: str, include_inactive: bool = False) -> list[TenantUser]:
-        """Get all users in a tenant"""
+    def _tenant_users_query(tenant_id: str, include_inactive: bool):
+        """Select the users of a tenant, in ID order for stable paging
+        
+        The password hashes are left out, listings don't need them, and
+        reading one raises rather than loading it row by row.
+        """
+        query = (
+            select(TenantUser)
+            .options(defer(TenantUser.password, raiseload=True))
+            .where(TenantUser.tenant_id == tenant_id)
+        )
+        
+        if not include_inactive:
+            query = query.where(TenantUser.is_active == True)
+        
+        return query.order_by(TenantUser.id)
+    
+    @staticmethod
+    def get_tenant_users(tenant_id: str, include_inactive: bool = False,
+                         session: Optional[Session] = None, *,
+                         limit: Optional[int] = None, offset: int = 0) -> list[TenantUser]:
+        """Get the users in a tenant, optionally a page of them and within the
+        caller's session"""
+        with nullcontext(session) if session else Session(engine) as session:
+            query = TenantAuthService._tenant_users_query(tenant_id, include_inactive)
+            query = query.offset(offset)
+            if limit is not None:
+                query = query.limit(limit)
+            
+            return list(session.exec(query).all())
+    
+    @staticmethod
+    def iter_tenant_users(tenant_id: str, include_inactive: bool = False,
+                          batch_size: int = 500) -> Iterator[TenantUser]:
+        """Stream all the users in a tenant, e.g. for exports
+        
+        Rows are fetched `batch_size` at a time rather than all at once.
+        """
         with Session(engine) as session:
-            query = select(TenantUser).where(TenantUser.tenant_id == tenant_id)
+            query = TenantAuthService._tenant_users_query(tenant_id, include_inactive)
+            yield from session.exec(query.execution_options(yield_per=batch_size))
+    
+    @staticmethod
+    def get_tenant_users_rows(tenant_id: str, include_inactive: bool = False,
+                              session: Optional[Session] = None,
+                              offset: int = 0, limit: Optional[int] = None) -> list:
+        """Get the users of a tenant as plain rows, for listing
+        
+        Only the listed columns are selected, no `TenantUser` is built. The
+        role and status come back as display labels, e.g. "Admin", "Active".
+        
+        Args:
+            tenant_id: Tenant ID
+            include_inactive: Also list deactivated users
+            session: Optional session to run the query in
+            offset: Number of users to skip, in creation order
+            limit: Maximum number of users to return, all if None
+        
+        Returns:
+            List of (id, username, email, role, status, last_login) rows
+        """
+        with nullcontext(session) if session else Session(engine) as session:
+            query = select(
+                TenantUser.id,
+                TenantUser.username,
+                TenantUser.email,
+                _ROLE_TITLE,
+                _STATUS_LABEL,
+                TenantUser.last_login,
+            ).where(TenantUser.tenant_id == tenant_id)
             
             if not include_inactive:
                 query = query.where(TenantUser.is_active == True)
             
+            query = query.order_by(TenantUser.date_created, TenantUser.id).offset(offset)
+            if limit is not None:
+                query = query.limit(limit)
+            
             return list(session.exec(query).all())
     
     @staticmethod
-    def update_user_role(user_id: str, new_role: UserRole, updated_by: str) -> Optional[TenantUser]:
-        """Update user role within tenant"""
-        with Session(engine) as session:
-            user = session.get(TenantUser, user_id)
-            if not user:
-                return None
-            
-            user.role = new_role
-            user.admin = (new_role == UserRole.ADMIN)  # Legacy compatibility
-            user.date_updated = datetime.datetime.now(get_localzone())
+    def filter_accessible_conversations(user: AuthUser, ids: list[str]) -> set[str]:
+        """
+        Get which of the given conversations the user can access
+        
+        Checks all the ids in one query, rather than one per conversation.
+        
+        Args:
+            user: The user asking for the conversations
+            ids: Conversation ids to check
             
-            session.add(user)
+        Returns:
+            The subset of `ids` belonging to the user's tenant
+        """
+        if not ids:
+            return set()
+        
+        with Session(engine) as session:
+            return set(session.exec(
+                select(TenantConversation.id).where(
+                    TenantConversation.id.in_(ids),
+                    TenantConversation.tenant_id == user.tenant_id
+                )
+            ).all())
+    
+    @staticmethod
+    def _update_user(user_id: str, **values) -> Optional[TenantUser]:
+        """Set columns of a user in a single UPDATE, no row loaded first
+        
+        Returns:
+            the updated user, None if there is no such user
+        """
+        values["date_updated"] = datetime.datetime.now(_LOCAL_TZ)
+        query = update(TenantUser).where(TenantUser.id == user_id).values(**values)
+        
+        # the returned row stays readable once the session is closed
+        with Session(engine, expire_on_commit=False) as session:
+            if engine.dialect.update_returning:
+                user = session.execute(query.returning(TenantUser)).scalar_one_or_none()
+            else:
+                # e.g. MySQL, read the row back after the update
+                session.execute(query)
+                user = session.get(TenantUser, user_id)
             session.commit()
-            
-            return user
+        
+        TenantAuthService.invalidate_user_cache(user_id)
+        return user
+    
+    @staticmethod
+    def update_user_role(user_id: str, new_role: UserRole, updated_by: str) -> Optional[TenantUser]:
+        """Update user role within tenant"""
+        values = {"role": new_role}
+        if hasattr(TenantUser, "admin"):
+            values["admin"] = (new_role == UserRole.ADMIN)  # Legacy compatibility
+        return TenantAuthService._update_user(user_id, **values)
     
     @staticmethod
     def deactivate_user(user_id: str, deactivated_by: str) -> Optional[TenantUser]:
         """Deactivate a user account"""
-        with Session(engine) as session:
-            user = session.get(TenantUser, user_id)
-            if not user:
-                return None
-            
-            user.is_active = False
-            user.date_updated = datetime.datetime.now(get_localzone())
-            
-            session.add(user)
-            session.commit()
-            
-            return user
+        return TenantAuthService._update_user(user_id, is_active=False)
     
     @classmethod
     def create_session(cls, auth_user: AuthUser) -> str:
         """Create a new session for authenticated user"""
-        cls._ensure_sessions_dir()
-        cls._cleanup_expired_sessions()
+        cls._maybe_cleanup_expired_sessions()
         
-        session_id = str(uuid.uuid4())
+        session_id = secrets.token_urlsafe(16)
+        now = datetime.datetime.now()
         session_data = {
             "session_id": session_id,
             "user_id": auth_user.id,
@@ -409,13 +778,11 @@ class TenantAuthService:
             "role": auth_user.role.value,
             "tenant_id": auth_user.tenant_id,
             "tenant_name": auth_user.tenant_name,
-            "created_at": datetime.datetime.now().isoformat(),
-            "expires_at": (datetime.datetime.now() + datetime.timedelta(hours=cls._session_timeout_hours)).isoformat()
+            "created_at": now.isoformat(),
+            "expires_at": (now + datetime.timedelta(hours=cls._session_timeout_hours)).isoformat()
         }
         
-        session_file = cls._get_session_file(session_id)
-        with open(session_file, 'w') as f:
-            json.dump(session_data, f, indent=2)
+        session_store.put(cls._sessions_dir, session_data)
         
         return session_id
     
@@ -425,22 +792,11 @@ class TenantAuthService:
         if not session_id:
             return None
         
-        session_file = cls._get_session_file(session_id)
-        if not session_file.exists():
-            return None
-        
+        # Expired sessions are skipped here, and purged on the next login
         try:
-            with open(session_file, 'r') as f:
-                session_data = json.load(f)
-            
-            # Check if session is expired
-            expires_at = datetime.datetime.fromisoformat(session_data['expires_at'])
-            if datetime.datetime.now() > expires_at:
-                cls._delete_session(session_id)
-                return None
-            
-            return session_data
-        except (json.JSONDecodeError, KeyError, ValueError):
+            return session_store.get(cls._sessions_dir, session_id)
+        except ValueError:
+            # Unreadable record, delete it
             cls._delete_session(session_id)
             return None
     
@@ -457,15 +813,8 @@ class TenantAuthService:
     
     @classmethod
     def _delete_session(cls, session_id: str) -> bool:
-        """Internal method to delete a session file"""
-        session_file = cls._get_session_file(session_id)
-        if session_file.exists():
-            try:
-                session_file.unlink()
-                return True
-            except OSError:
-                return False
-        return False
+        """Internal method to delete a session"""
+        return session_store.delete(cls._sessions_dir, session_id)
 
 
 class TenantAuthMiddleware:
@@ -494,9 +843,12 @@ class TenantAuthMiddleware:
         if not TenantAuthMiddleware.require_admin(actor):
             return False
         
-        with Session(engine) as session:
-            target_user = session.get(TenantUser, target_user_id)
-            if not target_user:
-                return False
-            
-            return actor.tenant_id == target_user.tenant_id
+        target_tenant_id = TenantAuthService.get_user_tenant_id(target_user_id)
+        return target_tenant_id is not None and actor.tenant_id == target_tenant_id
+    
+    @staticmethod
+    def can_manage_tenant_user(actor: Optional[AuthUser], target_tenant_id: str) -> bool:
+        """Check if actor can manage a user of the given tenant, for callers
+        already holding the target user"""
+        return (TenantAuthMiddleware.require_admin(actor) and 
+                actor.tenant_id == target_tenant_id)
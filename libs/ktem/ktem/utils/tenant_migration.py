@@ -3,8 +3,14 @@ Utility for migrating existing single-tenant data to multi-tenant structure
 """
 
 import datetime
-from typing import List, Dict, Any, Optional
+import io
+import json
+import logging
+from enum import Enum
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Union
 
+from sqlalchemy import func, insert
 from sqlmodel import Session, select
 from ktem.db.models import (
     User, Conversation, Settings, 
@@ -14,6 +20,82 @@ from ktem.db.models import (
 from ktem.db.tenant_models import UserRole, TenantStatus
 from ktem.services.tenant_auth import TenantAuthService
 
+logger = logging.getLogger(__name__)
+
+# rows read and inserted at a time when copying a table
+_MIGRATION_BATCH_SIZE = 1000
+
+
+def _count(model):
+    """Subquery counting the rows of a table, to select alongside others"""
+    return select(func.count()).select_from(model).scalar_subquery()
+
+
+def _stream(session: Session, *entities) -> Iterator[List[Any]]:
+    """Stream all the rows of a table, in batches of `_MIGRATION_BATCH_SIZE`
+
+    Args:
+        entities: the model to read, or some of its columns, which are
+            returned as plain rows without building model instances
+    """
+    return session.exec(
+        select(*entities).execution_options(yield_per=_MIGRATION_BATCH_SIZE)
+    ).partitions()
+
+
+def _copy_field(value: Any) -> str:
+    """Format a value as a field of PostgreSQL's COPY text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, Enum):
+        # enum columns store the member names
+        value = value.name
+    elif isinstance(value, dict):
+        value = json.dumps(value)
+    elif isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _insert_rows(session: Session, model, rows: List[Dict[str, Any]], fast_copy: bool) -> None:
+    """Insert a batch of rows into a table
+    
+    With `fast_copy` on PostgreSQL through psycopg2, the batch is loaded with
+    COPY FROM STDIN, otherwise with a multi-row INSERT. Either way, keys that
+    aren't columns of the table, e.g. a missing legacy column, are left out.
+    """
+    bind = session.get_bind()
+    if not (fast_copy and bind.dialect.driver == "psycopg2"):
+        session.execute(insert(model), rows)
+        return
+    
+    table = model.__table__
+    columns = [key for key in rows[0] if key in table.c]
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_field(row[key]) for key in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    
+    # e.g. the legacy `user` column is a reserved word
+    quote = bind.dialect.identifier_preparer
+    sql = "COPY {} ({}) FROM STDIN".format(
+        quote.format_table(table), ", ".join(quote.quote(key) for key in columns)
+    )
+    # the raw connection of the session, so the rows are in its transaction
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
 
 class TenantMigrationService:
     """Service for migrating existing data to multi-tenant structure"""
@@ -22,7 +104,9 @@ class TenantMigrationService:
     def migrate_to_tenant_system(
         default_tenant_name: str = "Default Organization",
         default_tenant_domain: Optional[str] = None,
-        make_first_user_admin: bool = True
+        make_first_user_admin: bool = True,
+        collect_details: bool = False,
+        fast_copy: bool = True
     ) -> Dict[str, Any]:
         """
         Migrate existing single-tenant data to multi-tenant structure
@@ -31,115 +115,144 @@ class TenantMigrationService:
             default_tenant_name: Name for the default tenant
             default_tenant_domain: Domain for the default tenant
             make_first_user_admin: Whether to make the first user an admin
+            collect_details: Whether to list every migrated row in the report,
+                otherwise only the counts are reported
+            fast_copy: Whether to load the rows with COPY on PostgreSQL,
+                when connected through psycopg2
             
         Returns:
             Migration report
         """
-        with Session(engine) as session:
-            # Check if migration is needed
-            existing_tenants = session.exec(select(Tenant)).all()
-            if existing_tenants:
+        # one transaction for the whole migration, committed when the block
+        # exits, or rolled back as a whole on error
+        with Session(engine) as session, session.begin():
+            # Check if migration is needed, stopping at the first tenant
+            tenants_exist = session.exec(select(1).select_from(Tenant).limit(1)).first()
+            if tenants_exist:
                 return {
                     "status": "skipped",
                     "message": "Tenants already exist, migration not needed"
                 }
             
-            # Create default tenant
+            # Create default tenant. Its id is generated when the model is
+            # built, so it is inserted straight away like the migrated rows,
+            # without being tracked by the session
             default_tenant = Tenant(
                 name=default_tenant_name,
                 domain=default_tenant_domain,
                 status=TenantStatus.ACTIVE,
                 settings={}
             )
-            session.add(default_tenant)
-            session.flush()  # Get tenant ID
+            session.execute(insert(Tenant), [default_tenant.model_dump()])
             
-            # Migrate users
-            existing_users = session.exec(select(User)).all()
-            migrated_users = []
+            # Migrate users. Each table is streamed and inserted in batches of
+            # _MIGRATION_BATCH_SIZE rows, so that memory doesn't grow with it.
+            # The tables are copied one after the other: conversations and
+            # settings reference the users, and all of them must land in this
+            # one transaction, so they can't be loaded on separate connections
+            migrated_users = [] if collect_details else None
+            users_count = 0
+            # every migrated user gets the same timestamps
+            now = datetime.datetime.now()
+            # the first user becomes admin, if requested
+            make_admin = make_first_user_admin
+            admin_role, user_role = UserRole.ADMIN, UserRole.USER
             
-            for i, old_user in enumerate(existing_users):
-                # Determine role (first user or existing admin becomes admin)
-                is_admin = (i == 0 and make_first_user_admin) or old_user.admin
-                role = UserRole.ADMIN if is_admin else UserRole.USER
-                
-                # Create tenant user
-                tenant_user = TenantUser(
-                    id=old_user.id,  # Keep same ID for compatibility
-                    username=old_user.username,
-                    username_lower=old_user.username_lower,
-                    email=old_user.username,  # Use username as email if no email field
-                    password=old_user.password,
-                    tenant_id=default_tenant.id,
-                    role=role,
-                    is_active=True,
-                    admin=old_user.admin,  # Keep for compatibility
-                    date_created=datetime.datetime.now(),
-                    date_updated=datetime.datetime.now()
-                )
+            # only the copied columns are read, as plain rows
+            for batch in _stream(session, User.id, User.username, User.username_lower,
+                                 User.password, User.admin):
+                user_rows = []
+                for old_user in batch:
+                    # Determine role (first user or existing admin becomes admin)
+                    is_admin = make_admin or old_user.admin
+                    make_admin = False
+                    role = admin_role if is_admin else user_role
+                    
+                    # Tenant user row; columns missing from the table, e.g. the
+                    # legacy `admin` one, are left out of the INSERT
+                    user_rows.append({
+                        "id": old_user.id,  # Keep same ID for compatibility
+                        "username": old_user.username,
+                        "username_lower": old_user.username_lower,
+                        "email": old_user.username,  # Use username as email if no email field
+                        "password": old_user.password,
+                        "tenant_id": default_tenant.id,
+                        "role": role,
+                        "is_active": True,
+                        "admin": old_user.admin,  # Keep for compatibility
+                        "date_created": now,
+                        "date_updated": now
+                    })
+                    if collect_details:
+                        migrated_users.append({
+                            "old_id": old_user.id,
+                            "new_id": old_user.id,
+                            "username": old_user.username,
+                            "role": role.value
+                        })
                 
-                session.add(tenant_user)
-                migrated_users.append({
-                    "old_id": old_user.id,
-                    "new_id": tenant_user.id,
-                    "username": old_user.username,
-                    "role": role.value
-                })
+                _insert_rows(session, TenantUser, user_rows, fast_copy)
+                users_count += len(user_rows)
             
             # Migrate conversations
-            existing_conversations = session.exec(select(Conversation)).all()
-            migrated_conversations = []
+            migrated_conversations = [] if collect_details else None
+            conversations_count = 0
             
-            for old_conv in existing_conversations:
-                # Find corresponding tenant user
-                user_id = old_conv.user or None  # Handle legacy user field
-                
-                tenant_conv = TenantConversation(
-                    id=old_conv.id,  # Keep same ID
-                    name=old_conv.name,
-                    user_id=user_id,
-                    tenant_id=default_tenant.id,
-                    is_public=old_conv.is_public,
-                    data_source=old_conv.data_source,
-                    date_created=old_conv.date_created,
-                    date_updated=old_conv.date_updated,
-                    user=old_conv.user  # Keep legacy field
-                )
+            for batch in _stream(session, Conversation):
+                conv_rows = []
+                for old_conv in batch:
+                    # Find corresponding tenant user
+                    user_id = old_conv.user or None  # Handle legacy user field
+                    
+                    conv_rows.append({
+                        "id": old_conv.id,  # Keep same ID
+                        "name": old_conv.name,
+                        "user_id": user_id,
+                        "tenant_id": default_tenant.id,
+                        "is_public": old_conv.is_public,
+                        "data_source": old_conv.data_source,
+                        "date_created": old_conv.date_created,
+                        "date_updated": old_conv.date_updated,
+                        "user": old_conv.user  # Keep legacy field
+                    })
+                    if collect_details:
+                        migrated_conversations.append({
+                            "id": old_conv.id,
+                            "name": old_conv.name,
+                            "user_id": user_id
+                        })
                 
-                session.add(tenant_conv)
-                migrated_conversations.append({
-                    "id": old_conv.id,
-                    "name": old_conv.name,
-                    "user_id": user_id
-                })
+                _insert_rows(session, TenantConversation, conv_rows, fast_copy)
+                conversations_count += len(conv_rows)
             
             # Migrate settings
-            existing_settings = session.exec(select(Settings)).all()
-            migrated_settings = []
+            migrated_settings = [] if collect_details else None
+            settings_count = 0
             
-            for old_setting in existing_settings:
-                user_id = old_setting.user or None
-                
-                tenant_setting = TenantSettings(
-                    id=old_setting.id,  # Keep same ID
-                    user_id=user_id,
-                    tenant_id=default_tenant.id,
-                    setting=old_setting.setting,
-                    is_tenant_wide=(user_id is None),
-                    user=old_setting.user  # Keep legacy field
-                )
+            for batch in _stream(session, Settings):
+                setting_rows = []
+                for old_setting in batch:
+                    user_id = old_setting.user or None
+                    
+                    setting_rows.append({
+                        "id": old_setting.id,  # Keep same ID
+                        "user_id": user_id,
+                        "tenant_id": default_tenant.id,
+                        "setting": old_setting.setting,
+                        "is_tenant_wide": (user_id is None),
+                        "user": old_setting.user  # Keep legacy field
+                    })
+                    if collect_details:
+                        migrated_settings.append({
+                            "id": old_setting.id,
+                            "user_id": user_id,
+                            "is_tenant_wide": user_id is None
+                        })
                 
-                session.add(tenant_setting)
-                migrated_settings.append({
-                    "id": old_setting.id,
-                    "user_id": user_id,
-                    "is_tenant_wide": user_id is None
-                })
-            
-            # Commit all changes
-            session.commit()
+                _insert_rows(session, TenantSettings, setting_rows, fast_copy)
+                settings_count += len(setting_rows)
             
-            return {
+            report = {
                 "status": "success",
                 "tenant": {
                     "id": default_tenant.id,
@@ -147,67 +260,87 @@ class TenantMigrationService:
                     "domain": default_tenant.domain
                 },
                 "migrated": {
-                    "users": len(migrated_users),
-                    "conversations": len(migrated_conversations), 
-                    "settings": len(migrated_settings)
-                },
-                "details": {
+                    "users": users_count,
+                    "conversations": conversations_count, 
+                    "settings": settings_count
+                }
+            }
+            if collect_details:
+                report["details"] = {
                     "users": migrated_users,
                     "conversations": migrated_conversations,
                     "settings": migrated_settings
                 }
-            }
+            
+            return report
     
     @staticmethod
-    def create_migration_backup() -> Dict[str, Any]:
+    def create_migration_backup(out_path: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
         """
         Create a backup of existing data before migration
         
+        The rows are streamed to an NDJSON file as they are read: a first line
+        with the timestamp, then one `{"table": ..., "row": ...}` line per row,
+        so memory doesn't grow with the size of the tables.
+        
+        Args:
+            out_path: File to write the backup to, defaults to a timestamped
+                file in the app data directory
+            
         Returns:
-            Backup data
+            Backup summary: file path, timestamp and number of rows per table
         """
-        with Session(engine) as session:
-            backup = {
-                "users": [],
-                "conversations": [],
-                "settings": [],
-                "timestamp": datetime.datetime.now().isoformat()
-            }
-            
-            # Backup users
-            users = session.exec(select(User)).all()
-            for user in users:
-                backup["users"].append({
-                    "id": user.id,
-                    "username": user.username,
-                    "username_lower": user.username_lower,
-                    "password": user.password,
-                    "admin": user.admin
-                })
-            
-            # Backup conversations
-            conversations = session.exec(select(Conversation)).all()
-            for conv in conversations:
-                backup["conversations"].append({
-                    "id": conv.id,
-                    "name": conv.name,
-                    "user": conv.user,
-                    "is_public": conv.is_public,
-                    "data_source": conv.data_source,
-                    "date_created": conv.date_created.isoformat(),
-                    "date_updated": conv.date_updated.isoformat()
-                })
+        timestamp = datetime.datetime.now()
+        if out_path is None:
+            from theflow.settings import settings as flowsettings
             
-            # Backup settings
-            settings = session.exec(select(Settings)).all()
-            for setting in settings:
-                backup["settings"].append({
-                    "id": setting.id,
-                    "user": setting.user,
-                    "setting": setting.setting
-                })
+            out_path = Path(flowsettings.KH_APP_DATA_DIR) / (
+                f"tenant_migration_backup_{timestamp:%Y%m%d_%H%M%S}.ndjson"
+            )
+        
+        # what is backed up of each row, per table
+        tables = [
+            ("users", User, lambda user: {
+                "id": user.id,
+                "username": user.username,
+                "username_lower": user.username_lower,
+                "password": user.password,
+                "admin": user.admin
+            }),
+            ("conversations", Conversation, lambda conv: {
+                "id": conv.id,
+                "name": conv.name,
+                "user": conv.user,
+                "is_public": conv.is_public,
+                "data_source": conv.data_source,
+                "date_created": conv.date_created.isoformat(),
+                "date_updated": conv.date_updated.isoformat()
+            }),
+            ("settings", Settings, lambda setting: {
+                "id": setting.id,
+                "user": setting.user,
+                "setting": setting.setting
+            }),
+        ]
+        
+        counts = {}
+        with Session(engine) as session, open(out_path, "w") as out:
+            out.write(json.dumps({"timestamp": timestamp.isoformat()}) + "\n")
             
-            return backup
+            for table, model, to_row in tables:
+                counts[table] = 0
+                rows = session.exec(
+                    select(model).execution_options(yield_per=_MIGRATION_BATCH_SIZE)
+                )
+                for row in rows:
+                    out.write(json.dumps({"table": table, "row": to_row(row)}) + "\n")
+                    counts[table] += 1
+        
+        return {
+            "path": str(out_path),
+            "timestamp": timestamp.isoformat(),
+            "counts": counts
+        }
     
     @staticmethod
     def verify_migration() -> Dict[str, Any]:
@@ -218,16 +351,17 @@ class TenantMigrationService:
             Verification report
         """
         with Session(engine) as session:
-            # Count original records
-            original_users = len(list(session.exec(select(User)).all()))
-            original_conversations = len(list(session.exec(select(Conversation)).all()))
-            original_settings = len(list(session.exec(select(Settings)).all()))
-            
-            # Count migrated records
-            tenants = len(list(session.exec(select(Tenant)).all()))
-            tenant_users = len(list(session.exec(select(TenantUser)).all()))
-            tenant_conversations = len(list(session.exec(select(TenantConversation)).all()))
-            tenant_settings = len(list(session.exec(select(TenantSettings)).all()))
+            # Count original and migrated records, in a single query so that
+            # all the counts are from the same snapshot
+            (
+                original_users, original_conversations, original_settings,
+                tenants, tenant_users, tenant_conversations, tenant_settings
+            ) = session.exec(select(*[
+                _count(model) for model in (
+                    User, Conversation, Settings,
+                    Tenant, TenantUser, TenantConversation, TenantSettings
+                )
+            ])).one()
             
             return {
                 "tenants_created": tenants,
@@ -260,19 +394,17 @@ class TenantMigrationService:
             Current status information
         """
         with Session(engine) as session:
-            # Check if we have tenants (migration done)
-            tenants = session.exec(select(Tenant)).all()
-            tenant_users = session.exec(select(TenantUser)).all()
-            
-            # Check if we have legacy data
-            legacy_users = session.exec(select(User)).all()
+            # Count tenants (migration done), their users, and legacy users
+            tenants, tenant_users, legacy_users = session.exec(
+                select(_count(Tenant), _count(TenantUser), _count(User))
+            ).one()
             
             if tenants:
                 status = "migrated"
-                message = f"Migration complete. {len(tenants)} tenant(s), {len(tenant_users)} user(s)"
+                message = f"Migration complete. {tenants} tenant(s), {tenant_users} user(s)"
             elif legacy_users:
                 status = "needs_migration"
-                message = f"Migration needed. {len(legacy_users)} legacy user(s) found"
+                message = f"Migration needed. {legacy_users} legacy user(s) found"
             else:
                 status = "fresh_install"
                 message = "Fresh installation. No data to migrate"
@@ -281,9 +413,9 @@ class TenantMigrationService:
                 "status": status,
                 "message": message,
                 "counts": {
-                    "tenants": len(tenants),
-                    "tenant_users": len(tenant_users),
-                    "legacy_users": len(legacy_users)
+                    "tenants": tenants,
+                    "tenant_users": tenant_users,
+                    "legacy_users": legacy_users
                 }
             }
 
@@ -308,72 +440,69 @@ def run_migration_if_needed(
     Returns:
         True if migration was run, False if not needed
     """
+    from theflow.settings import settings as flowsettings
+    
     # Load defaults from settings if not provided
     if tenant_name is None:
-        from theflow.settings import settings as flowsettings
         tenant_name = getattr(flowsettings, "KH_DEFAULT_TENANT_NAME", "Default Organization")
     
     if tenant_domain is None:
-        from theflow.settings import settings as flowsettings
         tenant_domain = getattr(flowsettings, "KH_DEFAULT_TENANT_DOMAIN", None)
     
     if admin_username is None:
-        from theflow.settings import settings as flowsettings
         admin_username = getattr(flowsettings, "KH_DEFAULT_SUPER_ADMIN", "superadmin")
     
     if admin_email is None:
-        from theflow.settings import settings as flowsettings
         admin_email = getattr(flowsettings, "KH_DEFAULT_SUPER_ADMIN_EMAIL", "superadmin@kotaemon.com")
     
     if admin_password is None:
-        from theflow.settings import settings as flowsettings
         admin_password = getattr(flowsettings, "KH_DEFAULT_SUPER_ADMIN_PASSWORD", "superadmin")
     
     status = TenantMigrationService.get_migration_status()
     
     if status["status"] == "needs_migration":
-        print("🔄 Running tenant migration...")
-        print(f"📋 Using defaults: Tenant='{tenant_name}', Admin='{admin_username}', Email='{admin_email}'")
+        logger.info("Running tenant migration...")
+        logger.info(f"Using defaults: Tenant='{tenant_name}', Admin='{admin_username}', Email='{admin_email}'")
         
         # Create backup
-        print("📦 Creating backup...")
+        logger.info("Creating backup...")
         backup = TenantMigrationService.create_migration_backup()
-        print(f"📦 Backup created with {len(backup['users'])} users, "
-              f"{len(backup['conversations'])} conversations, "
-              f"{len(backup['settings'])} settings")
+        logger.info(f"Backup written to {backup['path']} with {backup['counts']['users']} users, "
+                    f"{backup['counts']['conversations']} conversations, "
+                    f"{backup['counts']['settings']} settings")
         
         # Run migration
-        print("🚀 Migrating to tenant system...")
+        logger.info("Migrating to tenant system...")
         result = TenantMigrationService.migrate_to_tenant_system(
             default_tenant_name=tenant_name,
             default_tenant_domain=tenant_domain
         )
         
         if result["status"] == "success":
-            print("✅ Migration completed successfully!")
-            print(f"📊 Migrated: {result['migrated']['users']} users, "
-                  f"{result['migrated']['conversations']} conversations, "
-                  f"{result['migrated']['settings']} settings")
+            logger.info("Migration completed successfully")
+            logger.info(f"Migrated: {result['migrated']['users']} users, "
+                        f"{result['migrated']['conversations']} conversations, "
+                        f"{result['migrated']['settings']} settings")
             
             # Verify migration
             verification = TenantMigrationService.verify_migration()
             if verification["migration_complete"]:
-                print("✅ Migration verification passed!")
+                logger.info("Migration verification passed")
                 return True
             else:
-                print("❌ Migration verification failed!")
+                logger.error("Migration verification failed")
                 return False
         else:
-            print(f"❌ Migration failed: {result.get('message', 'Unknown error')}")
+            logger.error(f"Migration failed: {result.get('message', 'Unknown error')}")
             return False
     
     elif status["status"] == "migrated":
-        print("ℹ️  Migration already completed")
+        logger.info("Migration already completed")
         return False
     
     elif status["status"] == "fresh_install":
-        print("🆕 Fresh installation detected, creating default tenant...")
-        print(f"📋 Using defaults: Tenant='{tenant_name}', Admin='{admin_username}', Email='{admin_email}'")
+        logger.info("Fresh installation detected, creating default tenant...")
+        logger.info(f"Using defaults: Tenant='{tenant_name}', Admin='{admin_username}', Email='{admin_email}'")
         
         try:
             tenant, admin_user = TenantAuthService.create_tenant(
@@ -384,18 +513,18 @@ def run_migration_if_needed(
                 admin_password=admin_password
             )
             
-            print(f"✅ Default tenant '{tenant.name}' created successfully!")
-            print(f"👤 Admin user '{admin_user.username}' created with role: {admin_user.role.value}")
-            print(f"🔑 Default login: username='{admin_username}', password='{admin_password}'")
+            logger.info(f"Default tenant '{tenant.name}' created successfully")
+            logger.info(f"Admin user '{admin_user.username}' created with role: {admin_user.role.value}, "
+                        "password from KH_DEFAULT_SUPER_ADMIN_PASSWORD")
             
             return True
             
         except Exception as e:
-            print(f"❌ Failed to create default tenant: {e}")
+            logger.error(f"Failed to create default tenant: {e}")
             return False
     
     else:
-        print("ℹ️  No migration needed")
+        logger.info("No migration needed")
         return False
 
 
@@ -428,94 +557,88 @@ def ensure_default_tenant() -> bool:
     user_email = getattr(flowsettings, "KH_DEFAULT_USER_EMAIL", "user@kotaemon.com")
     user_password = getattr(flowsettings, "KH_DEFAULT_USER_PASSWORD", "user")
     
-    with Session(engine) as session:
-        # Check if any tenants exist
-        existing_tenants = session.exec(select(Tenant)).all()
+    # the created rows stay readable after the commit, for the summary below
+    with Session(engine, expire_on_commit=False) as session:
+        # Check if any tenants exist, stopping at the first one
+        tenants_exist = session.exec(select(1).select_from(Tenant).limit(1)).first()
         
-        if existing_tenants:
+        if tenants_exist:
             # Tenants exist, check if default admin user exists in any tenant
+            # seeks on `ix_tu_username_lower_tenant`, leading with
+            # username_lower, and stops at the first match
             existing_admin = session.exec(
-                select(TenantUser).where(
+                select(TenantUser.id).where(
                     TenantUser.username_lower == admin_username.lower(),
                     TenantUser.role == UserRole.ADMIN
-                )
+                ).limit(1)
             ).first()
             
-            if existing_admin:
-                print(f"ℹ️  Default tenant admin '{admin_username}' already exists")
+            if existing_admin is not None:
+                logger.info(f"Default tenant admin '{admin_username}' already exists")
                 return False
             else:
-                print(f"⚠️  Tenants exist but no admin user '{admin_username}' found")
+                logger.warning(f"Tenants exist but no admin user '{admin_username}' found")
                 return False
         
         # No tenants exist, create default tenant with all three user roles
-        print(f"🏗️  Creating default tenant '{tenant_name}' with three user roles...")
+        logger.info(f"Creating default tenant '{tenant_name}' with three user roles...")
         
         try:
-            # Create tenant with super admin first
+            # Create tenant with super admin first, all the rows are committed
+            # together below
             tenant, super_admin_user = TenantAuthService.create_tenant(
                 name=tenant_name,
                 domain=tenant_domain,
                 admin_username=super_admin_username,
                 admin_email=super_admin_email,
-                admin_password=super_admin_password
+                admin_password=super_admin_password,
+                session=session
             )
+            # not inserted yet, so the role goes in with the INSERT
+            super_admin_user.role = UserRole.SUPER_ADMIN
             
-            # Update super admin role to SUPER_ADMIN and create other users
-            with Session(engine) as session:
-                # Update super admin role
-                super_admin_user_db = session.get(TenantUser, super_admin_user.id)
-                super_admin_user_db.role = UserRole.SUPER_ADMIN
-                session.add(super_admin_user_db)
-                
-                # Create regular admin user
-                admin_user_db = TenantUser(
-                    username=admin_username,
-                    username_lower=admin_username.lower(),
-                    email=admin_email,
-                    password=TenantAuthService.hash_password(admin_password),
-                    tenant_id=tenant.id,
-                    role=UserRole.ADMIN,
-                    is_active=True
-                )
-                session.add(admin_user_db)
-                
-                # Create regular user
-                regular_user_db = TenantUser(
-                    username=user_username,
-                    username_lower=user_username.lower(),
-                    email=user_email,
-                    password=TenantAuthService.hash_password(user_password),
-                    tenant_id=tenant.id,
-                    role=UserRole.USER,
-                    is_active=True
-                )
-                session.add(regular_user_db)
-                
-                session.commit()
+            admin_password_hash, user_password_hash = TenantAuthService.hash_passwords_bulk(
+                [admin_password, user_password]
+            )
+            
+            # Create regular admin user
+            admin_user_db = TenantUser(
+                username=admin_username,
+                username_lower=admin_username.lower(),
+                email=admin_email,
+                password=admin_password_hash,
+                tenant_id=tenant.id,
+                role=UserRole.ADMIN,
+                is_active=True
+            )
+            
+            # Create regular user
+            regular_user_db = TenantUser(
+                username=user_username,
+                username_lower=user_username.lower(),
+                email=user_email,
+                password=user_password_hash,
+                tenant_id=tenant.id,
+                role=UserRole.USER,
+                is_active=True
+            )
+            session.add_all([admin_user_db, regular_user_db])
+            
+            # the flush inserts the tenant, then the three pending users of the
+            # same table together, as a single multi-row INSERT
+            session.commit()
             
-            print(f"✅ Default tenant created successfully!")
-            print(f"🏢 Tenant: {tenant.name} (ID: {tenant.id})")
-            print()
-            print(f"👑 SUPER ADMIN (full access + tenant management):")
-            print(f"   Username: {super_admin_username}")
-            print(f"   Password: {super_admin_password}")
-            print(f"   Email: {super_admin_email}")
-            print()
-            print(f"🛡️  ADMIN (chat, files, resources, settings, help):")
-            print(f"   Username: {admin_username}")
-            print(f"   Password: {admin_password}")
-            print(f"   Email: {admin_email}")
-            print()
-            print(f"👤 USER (chat and files only):")
-            print(f"   Username: {user_username}")
-            print(f"   Password: {user_password}")
-            print(f"   Email: {user_email}")
-            print()
-            print(f"🌐 Access at: http://localhost:7860 (or your configured URL)")
+            # the passwords are never logged, they are the KH_DEFAULT_*_PASSWORD
+            # settings
+            logger.info(f"Default tenant '{tenant.name}' created (ID: {tenant.id})")
+            logger.info(f"Super admin (full access + tenant management): "
+                        f"{super_admin_username} <{super_admin_email}>")
+            logger.info(f"Admin (chat, files, resources, settings, help): "
+                        f"{admin_username} <{admin_email}>")
+            logger.info(f"User (chat and files only): {user_username} <{user_email}>")
             
             return True
             
         except Exception as e:
-            print(f"❌ Failed to create default tenant: {e}")
+            logger.error(f"Failed to create default tenant: {e}")
             return False
@@ -0,0 +1,55 @@
+import pytest
+from ktem.db.engine import count_queries, engine
+from ktem.db.models import Tenant, TenantUser, ensure_schema
+from ktem.services.tenant_auth import TenantAuthService
+from sqlmodel import Session
+
+
+@pytest.fixture(scope="function")
+def session():
+    """A session whose changes are rolled back after the test"""
+    ensure_schema()
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        with Session(bind=connection) as session:
+            yield session
+        transaction.rollback()
+
+
+def _add_users(session, tenant_id, start, count):
+    session.add_all(
+        [
+            TenantUser(
+                username=f"user{i}",
+                username_lower=f"user{i}",
+                email=f"user{i}@example.com",
+                password="not-a-hash",
+                tenant_id=tenant_id,
+            )
+            for i in range(start, start + count)
+        ]
+    )
+    session.flush()
+
+
+def test_tenant_users_rows_query_count(session):
+    """Loading the users table runs one statement, whatever the user count"""
+    tenant = Tenant(name="Query count")
+    session.add(tenant)
+    session.flush()
+
+    _add_users(session, tenant.id, 0, 1)
+    with count_queries() as few_queries:
+        rows = TenantAuthService.get_tenant_users_rows(
+            tenant.id, session=session, limit=100
+        )
+    assert len(rows) == 1
+
+    _add_users(session, tenant.id, 1, 20)
+    with count_queries() as many_queries:
+        rows = TenantAuthService.get_tenant_users_rows(
+            tenant.id, session=session, limit=100
+        )
+    assert len(rows) == 21
+
+    assert few_queries[0] == many_queries[0] == 1
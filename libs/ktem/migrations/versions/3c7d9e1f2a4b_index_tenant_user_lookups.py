@@ -0,0 +1,68 @@
+"""index the tenant user login lookups
+
+Replaces the single-column username_lower and tenant_id indexes of
+tenantuser with composite ones, serving the login lookup and the paged
+listing of a tenant's users. Indexes that already exist, e.g. created by
+`ensure_schema` on a fresh database, are left as they are.
+
+Revision ID: 3c7d9e1f2a4b
+Revises:
+Create Date: 2026-10-15 22:12:30.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c7d9e1f2a4b"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "tenantuser"
+
+NEW_INDEXES = {
+    "ix_tu_username_lower_tenant": ["username_lower", "tenant_id", "is_active"],
+    "ix_tu_tenant_active": ["tenant_id", "is_active", "id"],
+}
+OLD_INDEXES = {
+    "ix_tenantuser_username_lower": ["username_lower"],
+    "ix_tenantuser_tenant_id": ["tenant_id"],
+}
+
+
+def _existing_indexes() -> Union[set, None]:
+    """Names of the indexes of the table, None if the table doesn't exist"""
+    inspector = sa.inspect(op.get_bind())
+    if TABLE not in inspector.get_table_names():
+        return None
+    return {index["name"] for index in inspector.get_indexes(TABLE)}
+
+
+def _swap_indexes(create: dict, drop: dict) -> None:
+    existing = _existing_indexes()
+    if existing is None:
+        # created with the current indexes by `ensure_schema`
+        return
+
+    # on PostgreSQL, build the indexes without locking the table for writes;
+    # CONCURRENTLY can't run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, columns in create.items():
+            if name not in existing:
+                op.create_index(name, TABLE, columns, postgresql_concurrently=True)
+        for name in drop:
+            if name in existing:
+                op.drop_index(name, table_name=TABLE, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    _swap_indexes(create=NEW_INDEXES, drop=OLD_INDEXES)
+
+
+def downgrade() -> None:
+    _swap_indexes(create=OLD_INDEXES, drop=NEW_INDEXES)
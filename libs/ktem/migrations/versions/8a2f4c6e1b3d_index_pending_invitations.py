@@ -0,0 +1,51 @@
+"""index the pending invitations of a tenant
+
+Adds the (tenant_id, is_used, expires_at) index serving the pending-first
+listing of a tenant's invitations, unless it already exists.
+
+Revision ID: 8a2f4c6e1b3d
+Revises: 3c7d9e1f2a4b
+Create Date: 2026-10-15 22:08:37.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8a2f4c6e1b3d"
+down_revision: Union[str, None] = "3c7d9e1f2a4b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "tenantinvitation"
+INDEX = "ix_invite_tenant_status"
+
+
+def _has_index() -> Union[bool, None]:
+    """Whether the index exists, None if the table doesn't exist"""
+    inspector = sa.inspect(op.get_bind())
+    if TABLE not in inspector.get_table_names():
+        return None
+    return any(index["name"] == INDEX for index in inspector.get_indexes(TABLE))
+
+
+def upgrade() -> None:
+    if _has_index() is False:
+        # CONCURRENTLY can't run inside the migration transaction
+        with op.get_context().autocommit_block():
+            op.create_index(
+                INDEX,
+                TABLE,
+                ["tenant_id", "is_used", "expires_at"],
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    if _has_index():
+        with op.get_context().autocommit_block():
+            op.drop_index(INDEX, table_name=TABLE, postgresql_concurrently=True)